@@ -0,0 +1,34 @@
+"""add index on links expires_at
+
+Revision ID: 4f2a9c1d7e3b
+Revises: bb629de70de0
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2a9c1d7e3b'
+down_revision: Union[str, None] = 'bb629de70de0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в links на время построения индекса
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_links_expires_at'), 'links', ['expires_at'], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_links_expires_at'), table_name='links', postgresql_concurrently=True)
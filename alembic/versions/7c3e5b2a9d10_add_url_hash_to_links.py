@@ -0,0 +1,64 @@
+"""add url_hash to links
+
+Revision ID: 7c3e5b2a9d10
+Revises: 4f2a9c1d7e3b
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.urls import url_hash
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e5b2a9d10'
+down_revision: Union[str, None] = '4f2a9c1d7e3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_url_hash() -> None:
+    """Заполняет url_hash пачками по id, в autocommit каждая пачка фиксируется сразу"""
+    connection = op.get_bind()
+    links = sa.table('links', sa.column('id', sa.Integer), sa.column('original_url', sa.String),
+                     sa.column('url_hash', sa.String))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(links.c.id, links.c.original_url)
+            .where(links.c.id > last_id, links.c.url_hash.is_(None))
+            .order_by(links.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            links.update()
+            .where(links.c.id == sa.bindparam('link_id'))
+            .values(url_hash=sa.bindparam('hash')),
+            [{'link_id': row.id, 'hash': url_hash(row.original_url)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('links', sa.Column('url_hash', sa.String(length=64), nullable=True))
+    # Бэкфилл и индекс вне общей транзакции миграции, чтобы не держать блокировку на всю таблицу
+    with op.get_context().autocommit_block():
+        backfill_url_hash()
+        op.create_index(
+            op.f('ix_links_url_hash'), 'links', ['url_hash'], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_links_url_hash'), table_name='links')
+    op.drop_column('links', 'url_hash')
@@ -0,0 +1,37 @@
+"""add owner keyset indexes to links
+
+Revision ID: 9b1d4e6f2a37
+Revises: 7c3e5b2a9d10
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1d4e6f2a37'
+down_revision: Union[str, None] = '7c3e5b2a9d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_links_owner_id_id', 'links', ['owner_id', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_links_owner_id_access_count_id', 'links', ['owner_id', 'access_count', 'id'], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_links_owner_id_access_count_id', table_name='links')
+    op.drop_index('ix_links_owner_id_id', table_name='links')
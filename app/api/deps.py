@@ -1,18 +1,64 @@
+import hashlib
+import time
+from functools import partial
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.core.security import decode_token
-from app.crud import crud_user
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.core.redis import token_cache, user_cache, async_redis_client
+from app.core.invalidation import RECENT_WRITE_PREFIX
+from app.crud import async_crud_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db, read_session, replicas
 from typing import Optional
 from app.schemas.user import UserInDB
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
-async def get_current_user(
-        token: str = Depends(oauth2_scheme), 
-        db: Session = Depends(get_db)
-        ):
+def resolve_token_email(token: str) -> str | None:
+    """
+    email из проверенного токена. Проверка подписи кэшируется по хэшу токена
+    до истечения его exp, невалидные токены не кэшируются
+    """
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    if email := token_cache.get(token_key):
+        return email
+
+    payload = decode_token(token)
+    if not payload:
+        return None
+    email = payload.get("sub")
+    if not email:
+        return None
+
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        token_cache.set(token_key, email, ttl=ttl)
+    return email
+
+async def prefers_primary(token: str | None) -> bool:
+    """Недавно писавший пользователь (метка recent_write:{email}) читает из основной БД"""
+    if replicas.engines and token and (email := resolve_token_email(token)):
+        return bool(await async_redis_client.exists(f"{RECENT_WRITE_PREFIX}{email}"))
+    return False
+
+async def get_async_read_db(token: str = Depends(oauth2_scheme)):
+    """
+    Сессия для запросов только на чтение. Недавно писавший пользователь
+    читает из основной БД, чтобы увидеть свои изменения. Метка проверяется
+    только при первом запросе к БД, ответы из кэша обходятся без неё
+    """
+    async with read_session(prefer_primary=partial(prefers_primary, token)) as db:
+        yield db
+
+def get_read_sessions():
+    """
+    Фабрика сессий для пересборки общих кэшей в rebuild_once (см. read_for_cache).
+    Пересборка общая для одновременных запросов и может пережить запрос,
+    который её начал, поэтому открывает свою сессию
+    """
+    return read_session
+
+async def load_current_user(token: str | None, db: AsyncSession):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -22,16 +68,35 @@ async def get_current_user(
     if not token:
         return None
     
-    payload = decode_token(token)
-    if not payload:
-        return None
-        
-    email = payload.get("sub")
+    email = resolve_token_email(token)
     if not email:
         return None
-    
-    user = crud_user.get_user_by_email(db, email)
-    if not user:
+
+    # В обычном случае пользователь берётся из памяти процесса без запроса к БД
+    if user := user_cache.get(email):
+        return user
+
+    db_user = await async_crud_user.get_user_by_email(db, email)
+    if not db_user:
         return None
-        
+
+    user = UserInDB.model_validate(db_user)
+    user_cache.set(email, user)
     return user
+
+async def get_current_user(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_read_db)
+        ):
+    """Текущий пользователь для чтений: при промахе кэша ищется в реплике"""
+    return await load_current_user(token, db)
+
+async def get_current_writer(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db)
+        ):
+    """
+    Текущий пользователь для записей: ищется в той же сессии основной БД,
+    что и у эндпоинта, чтобы запрос не открывал вторую сессию на реплике
+    """
+    return await load_current_user(token, db)
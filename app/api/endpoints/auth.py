@@ -1,47 +1,70 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
 from app.schemas.user import Token, UserCreate, UserInDB
-from app.crud import crud_user
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.crud import async_crud_user
+from app.core.security import (
+    create_access_token, verify_password_async, get_password_hash_async, PasswordHasherBusy
+)
+from app.core.invalidation import invalidate_user
 
 router = APIRouter(tags=["auth"])
 
+def password_hasher_busy() -> HTTPException:
+    """Ответ при переполненной очереди bcrypt: клиенту стоит повторить позже"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, try again later",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=UserInDB, status_code=status.HTTP_201_CREATED)
-def register_user(
+async def register_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Регистрация нового пользователя.
     Проверяет уникальность email и хеширует пароль.
     """
 
-    existing_user = crud_user.get_user_by_email(db, user_data.email)
+    existing_user = await async_crud_user.get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    new_user = crud_user.create_user(
+    # bcrypt блокирующий, выполняется в отдельном ограниченном пуле
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
+    new_user = await async_crud_user.create_user(
         db=db,
-        user_data=user_data
+        user_data=user_data,
+        hashed_password=hashed_password
     )
+    # Воркеры могли закэшировать прежнего пользователя с этим email
+    await invalidate_user(new_user.email)
     
     return new_user
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Залогин пользователя, выдает ему токен по имейлу и паролю
     """
-    user = crud_user.get_user_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await async_crud_user.get_user_by_email(db, form_data.username)
+    try:
+        verified = user is not None and await verify_password_async(form_data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
+    if not verified:
         raise HTTPException(
             status_code=400,
             detail="Incorrect email or password"
@@ -1,26 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.schemas.link import LinkCreate, LinkResponse, LinkUpdate, LinkStats
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
+from app.schemas.link import (
+    LinkCreate, LinkResponse, LinkUpdate, LinkStats, LinkBatchCreate, LinkBatchItemResult,
+    LinkListItem, LinkPage, LinkBulkDelete, LinkBulkUpdate, LinkBulkResult
+)
 from app.schemas.user import UserInDB
-from app.crud import crud_link
-from app.db.models import Link
-from app.core.redis import cache_redirect, get_cached_url
-from app.api.deps import get_current_user
-from typing import Optional, List
+from app.crud import async_crud_link
+from app.core.redis import (
+    cache_redirect, cache_missing_redirect, get_cached_url, get_with_ttl,
+    rebuild_once, should_refresh_early, get_user_links_page, cache_user_links_page, REDIRECT_NOT_FOUND
+)
+from app.core.invalidation import CacheInvalidation, invalidate_links, read_for_cache
+from app.core.bloom import short_code_index
+from app.api.redirect import LOOKUP_STATE_KEY, redirect_headers
+from app.core.urls import url_hash
+from app.core.config import settings
+from app.core.metrics import cache_lookups
+from app.core.clicks import track_click, get_pending_clicks
+from app.core.click_analytics import get_click_series
+from app.api.deps import get_current_user, get_current_writer, get_async_read_db, get_read_sessions
+from typing import Literal, Optional, List
 from app.core.logger import logger
-from app.core.redis import redis_client
+from app.core.redis import async_redis_client
+import base64
+import binascii
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter(prefix="/links", tags=["links"])
 
 @router.post("/shorten", response_model=LinkResponse)
-def create_short_link(
+async def create_short_link(
     link: LinkCreate,
-    current_user: Optional[UserInDB] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Optional[UserInDB] = Depends(get_current_writer),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создает короткую ссылку и записывает ее в БД. Работает для всех юзеров
@@ -31,40 +47,325 @@ def create_short_link(
     """
     try:
         owner_id = current_user.id if current_user else None
-        return crud_link.create_link(db, link, owner_id=owner_id)
+        new_link = await async_crud_link.create_link(db, link, owner_id=owner_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    # Перезаписываем возможный маркер 404 для этого кода во всех кэшах
+    invalidation = CacheInvalidation()
+    invalidation.created(new_link.short_code, new_link.original_url, new_link.expires_at, owner_id)
+    if current_user:
+        invalidation.wrote(current_user.email)
+    await invalidation.execute()
+    return new_link
+
+
+async def create_links_chunk(
+    db: AsyncSession,
+    items: list[tuple[int, LinkCreate]],
+    owner_id: int | None,
+    writer: str | None = None
+) -> list[dict]:
+    """Создает пачку ссылок и прогревает для них кэш редиректов"""
+    results = await async_crud_link.create_links_bulk(db, [link for _, link in items], owner_id=owner_id)
+    for (index, _), result in zip(items, results):
+        result["index"] = index
+    invalidation = CacheInvalidation()
+    for result in results:
+        if result["status"] == "created":
+            invalidation.created(result["short_code"], result["original_url"], result["expires_at"], owner_id)
+    if writer:
+        invalidation.wrote(writer)
+    await invalidation.execute()
+    return results
+
+@router.post("/shorten/batch", response_model=List[LinkBatchItemResult])
+async def create_short_links_batch(
+    batch: LinkBatchCreate,
+    current_user: Optional[UserInDB] = Depends(get_current_writer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Пакетно создает короткие ссылки. Работает для всех юзеров
+    batch: список ссылок для сокращения (не больше LINK_BATCH_MAX_ITEMS)
+    current_user: текущий пользователь в сессии (опционально)
+    db: указание базы данных
+    Возвращает результат по каждой ссылке: created или conflict для занятого алиаса
+    """
+    if len(batch.items) > settings.LINK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch is limited to {settings.LINK_BATCH_MAX_ITEMS} links"
+        )
+
+    owner_id = current_user.id if current_user else None
+    writer = current_user.email if current_user else None
+    items = list(enumerate(batch.items))
+    results = []
+    for start in range(0, len(items), settings.LINK_BATCH_CHUNK_SIZE):
+        chunk = items[start:start + settings.LINK_BATCH_CHUNK_SIZE]
+        results += await create_links_chunk(db, chunk, owner_id, writer)
+    return results
+
+async def iter_ndjson_lines(request: Request):
+    """Построчно читает тело запроса в формате NDJSON"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    yield buffer
+
+async def read_ndjson_batch(request: Request) -> list[tuple[int, LinkCreate | str]]:
+    """
+    Разбирает тело NDJSON целиком до начала ответа: ссылку или текст ошибки
+    для каждой непустой строки. Больше LINK_STREAM_MAX_ITEMS строк - 413
+    """
+    items = []
+    async for line in iter_ndjson_lines(request):
+        if not line.strip():
+            continue
+        if len(items) >= settings.LINK_STREAM_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch is limited to {settings.LINK_STREAM_MAX_ITEMS} links"
+            )
+        try:
+            items.append((len(items), LinkCreate.model_validate_json(line)))
+        except ValidationError as e:
+            items.append((len(items), str(e)))
+    return items
+
+@router.post("/shorten/batch/stream")
+async def create_short_links_stream(
+    request: Request,
+    current_user: Optional[UserInDB] = Depends(get_current_writer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Потоковое пакетное создание ссылок. Тело - NDJSON, по одной LinkCreate на строку,
+    не больше LINK_STREAM_MAX_ITEMS строк. Ссылки записываются пачками по
+    LINK_BATCH_CHUNK_SIZE, результаты отдаются NDJSON по мере записи,
+    невалидные строки возвращаются как invalid
+    """
+    items = await read_ndjson_batch(request)
+    owner_id = current_user.id if current_user else None
+    writer = current_user.email if current_user else None
+
+    async def results():
+        # Сессия из зависимости закрывается после отправки ответа
+        chunk = []
+        for index, item in items:
+            if isinstance(item, str):
+                yield LinkBatchItemResult(index=index, status="invalid", detail=item).model_dump_json() + "\n"
+                continue
+            chunk.append((index, item))
+            if len(chunk) >= settings.LINK_BATCH_CHUNK_SIZE:
+                for result in await create_links_chunk(db, chunk, owner_id, writer):
+                    yield LinkBatchItemResult(**result).model_dump_json() + "\n"
+                chunk = []
+
+        if chunk:
+            for result in await create_links_chunk(db, chunk, owner_id, writer):
+                yield LinkBatchItemResult(**result).model_dump_json() + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def require_user(current_user: Optional[UserInDB]) -> UserInDB:
+    """401 для анонимного запроса к эндпоинту, которому нужен пользователь"""
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return current_user
+
+def encode_cursor(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+# Значения курсора - id и access_count, столбцы INTEGER в Postgres
+CURSOR_VALUE_RANGE = range(-2 ** 31, 2 ** 31)
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(decoded, list) or len(decoded) != (2 if sort == "access_count" else 1):
+            raise ValueError
+        if not all(type(v) is int and v in CURSOR_VALUE_RANGE for v in decoded):
+            raise ValueError
+        return tuple(decoded)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+@router.get("/mine", response_model=LinkPage)
+async def list_my_links(
+    limit: int = Query(50, ge=1, le=settings.USER_LINKS_PAGE_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+    sort: Literal["id", "access_count"] = Query("id", description="Сортировка по убыванию"),
+    expired: Optional[bool] = Query(None, description="Только истёкшие (true) или только действующие (false)"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    current_user: Optional[UserInDB] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Постраничный список ссылок пользователя. Страницы выбираются по курсору
+    (id или access_count и id последней ссылки), поэтому не замедляются с ростом номера.
+    Первые страницы кэшируются в хэше user_links:{user_id}, который сбрасывается
+    при создании, изменении и удалении ссылок. Страница, прочитанная до сброса,
+    в кэш не пишется (см. cache_user_links_page). Отставшая реплика не вернёт
+    старую страницу недавно писавшему пользователю (см. get_async_read_db)
+    """
+    require_user(current_user)
+
+    page_key = json.dumps([limit, sort, expired, str(created_from), str(created_to)])
+    if cursor is None:
+        cached_page, version = await get_user_links_page(current_user.id, page_key)
+        cache_lookups.inc("user_links", "hit" if cached_page else "miss")
+        if cached_page:
+            return json.loads(cached_page)
+
+    after = decode_cursor(cursor, sort) if cursor else None
+    links = await async_crud_link.get_owner_links(
+        db, current_user.id, limit + 1, sort, after, expired, created_from, created_to
+    )
+
+    next_cursor = None
+    if len(links) > limit:
+        links = links[:limit]
+        last = links[-1]
+        next_cursor = encode_cursor([last.access_count, last.id] if sort == "access_count" else [last.id])
+    page = LinkPage(items=[LinkListItem.model_validate(link) for link in links], next_cursor=next_cursor)
+
+    if cursor is None:
+        await cache_user_links_page(current_user.id, page_key, page.model_dump_json(), version)
+    return page
+
+@router.post("/batch/delete", response_model=LinkBulkResult)
+async def delete_links_batch(
+    request: LinkBulkDelete,
+    current_user: Optional[UserInDB] = Depends(get_current_writer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Удаляет ссылки пользователя одним запросом к БД: по списку кодов
+    (не больше LINK_BULK_MAX_CODES) и/или все истёкшие (expired=true).
+    Кэши удалённых ссылок сбрасываются одним pipeline Redis
+    """
+    user = require_user(current_user)
+    if request.short_codes and len(request.short_codes) > settings.LINK_BULK_MAX_CODES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many codes, at most {settings.LINK_BULK_MAX_CODES} allowed"
+        )
+
+    deleted_links = await async_crud_link.delete_links_bulk(db, user.id, request.short_codes, request.expired)
+    if deleted_links:
+        await invalidate_links(deleted_links, user.id, removed=True, writer=user.email)
+
+    deleted = [short_code for short_code, _ in deleted_links]
+    not_found = sorted(set(request.short_codes or ()) - set(deleted))
+    return {"affected": deleted, "not_found": not_found}
+
+@router.post("/batch/update", response_model=LinkBulkResult)
+async def update_links_batch(
+    request: LinkBulkUpdate,
+    current_user: Optional[UserInDB] = Depends(get_current_writer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Меняет оригинальные URL нескольких ссылок пользователя одним UPDATE.
+    Повтор кода в запросе - берётся последний URL
+    """
+    user = require_user(current_user)
+    if len(request.items) > settings.LINK_BULK_MAX_CODES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many codes, at most {settings.LINK_BULK_MAX_CODES} allowed"
+        )
+
+    new_urls = {item.short_code: str(item.new_url) for item in request.items}
+    updated = await async_crud_link.update_links_bulk(db, user.id, new_urls)
+
+    invalidation = CacheInvalidation()
+    for short_code, expires_at, previous_hash in updated:
+        invalidation.link(short_code, user.id, url_hashes=[previous_hash, url_hash(new_urls[short_code])])
+        invalidation.write_redirect(short_code, new_urls[short_code], expires_at)
+    invalidation.wrote(user.email)
+    await invalidation.execute()
+
+    updated_codes = [short_code for short_code, _, _ in updated]
+    return {"affected": updated_codes, "not_found": sorted(set(new_urls) - set(updated_codes))}
 
-@router.get("/{short_code}", response_class=RedirectResponse, status_code=302)
-def redirect_to_original(
+REDIRECT_HEADERS = redirect_headers()
+
+def redirect_response(location: bytes) -> Response:
+    """Ответ редиректа с теми же кодом и заголовками, что и у быстрого пути"""
+    response = Response(status_code=settings.REDIRECT_STATUS_CODE)
+    response.raw_headers = [(b"location", location), *REDIRECT_HEADERS]
+    return response
+
+@router.get("/{short_code}", response_class=RedirectResponse, status_code=settings.REDIRECT_STATUS_CODE)
+async def redirect_to_original(
     short_code: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    sessions = Depends(get_read_sessions)
 ):
     """
-    Редиректит на оригинальную ссылку по короткой. Работает для всех юзеров
+    Редиректит на оригинальную ссылку по короткой. Работает для всех юзеров.
+    Попадания в кэш обычно отдаёт RedirectMiddleware, сюда приходят промахи
     short_code: короткое название для ссылки
-    db: указание базы данных
+    sessions: фабрика сессий чтения для пересборки кэша
     """
-    
-    if cached_url := get_cached_url(short_code):
-        return cached_url
-    
-    link = crud_link.get_link_by_short_code(db, short_code)
-    if not link:
+
+    # Кэш уже прочитан в RedirectMiddleware
+    lookup = request.scope.get("state", {}).get(LOOKUP_STATE_KEY)
+    cached_url, refresh = lookup or await get_cached_url(short_code)
+    if cached_url and not refresh:
+        if cached_url == REDIRECT_NOT_FOUND:
+            raise HTTPException(status_code=404, detail="Link not found")
+        track_click(request.headers, short_code)
+        return redirect_response(cached_url)
+
+    # Фильтр Блума точно знает, что такого кода нет
+    if cached_url is None and not short_code_index.might_exist(short_code):
+        raise HTTPException(status_code=404, detail="Link not found")
+
+    # Одновременные промахи по одному коду идут в БД одним запросом
+    cached_url = await rebuild_once(
+        f"redirect:{short_code}",
+        lambda: load_redirect(sessions, short_code),
+        lambda: async_redis_client.get(f"redirect:{short_code}"),
+        stale=cached_url,
+    )
+    if cached_url == REDIRECT_NOT_FOUND:
         raise HTTPException(status_code=404, detail="Link not found")
-    
-    # Обновляем статистику и кэшируем
-    crud_link.update_link_stats(db, link)
-    cache_redirect(short_code, str(link.original_url))
-    
-    return link.original_url
+
+    # Учитываем переход в буфере (в БД его запишет фоновая задача)
+    track_click(request.headers, short_code)
+    return redirect_response(cached_url)
+
+async def load_redirect(sessions, short_code: str) -> bytes:
+    """Читает ссылку из БД в своей сессии и кэширует её URL или маркер отсутствия"""
+    link = await read_for_cache(
+        sessions, f"redirect:{short_code}",
+        lambda db: async_crud_link.get_link_by_short_code(db, short_code)
+    )
+    if not link:
+        # Повторные запросы несуществующего кода не дойдут до БД
+        await cache_missing_redirect(short_code)
+        return REDIRECT_NOT_FOUND
+    await cache_redirect(short_code, str(link.original_url), link.expires_at)
+    return str(link.original_url).encode()
 
 @router.delete("/{short_code}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_link(
+async def delete_link(
     short_code: str,
-    current_user: UserInDB = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserInDB = Depends(get_current_writer),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удаляет ссылку, ранее созданную пользователем, из БД. Работает только для авторизованных пользователей
@@ -73,23 +374,17 @@ def delete_link(
     db: указание базы данных
     """
     try:
-        link = db.query(Link).filter(
-            Link.short_code == short_code,
-            Link.owner_id == current_user.id
-        ).first()
+        deleted = await async_crud_link.delete_link(db, short_code, current_user.id)
 
-        if not link:
+        if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Link not found"
             )
-        
-        db.delete(link)
-        db.commit()
 
-        redis_client.delete(f"redirect:{short_code}")
-        redis_client.delete(f"stats:{short_code}:{current_user.id}")
-        redis_client.delete(f"user_links:{current_user.id}")
+        await invalidate_links(
+            [(short_code, deleted.url_hash)], current_user.id, removed=True, writer=current_user.email
+        )
 
         return {"message": "Link has been deleted successfully"}
     except:
@@ -98,12 +393,12 @@ def delete_link(
             detail="Link not found or you don't have permissions"
         )
 
-@router.put("/{short_code}")
-def update_link(
+@router.put("/{short_code}", response_model=LinkResponse)
+async def update_link(
     short_code: str,
     link_update: LinkUpdate,
-    current_user: UserInDB = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserInDB = Depends(get_current_writer),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновляет ссылку, ранее созданную пользователем, из БД. Работает только для авторизованных пользователей
@@ -113,21 +408,25 @@ def update_link(
     db: указание базы данных
     """
     try:
-        updated_link = crud_link.update_link(
-            db, 
-            short_code, 
+        updated = await async_crud_link.update_link(
+            db,
+            short_code,
             str(link_update.new_url),
             current_user.id
         )
-        
-        if not updated_link:
+
+        if not updated:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Link not found or you don't have permissions"
             )
-        redis_client.delete(f"redirect:{short_code}")
-        redis_client.delete(f"stats:{short_code}:{current_user.id}")
-        redis_client.delete(f"user_links:{current_user.id}")
+        updated_link, previous_hash = updated
+        # Новый URL сразу пишется в кэш, следующий переход не пойдёт в БД
+        invalidation = CacheInvalidation()
+        invalidation.link(short_code, current_user.id, url_hashes=[previous_hash, updated_link.url_hash])
+        invalidation.write_redirect(short_code, updated_link.original_url, updated_link.expires_at)
+        invalidation.wrote(current_user.email)
+        await invalidation.execute()
         return updated_link
     except:
         raise HTTPException(
@@ -135,89 +434,142 @@ def update_link(
             detail="Link not found or you don't have permissions"
         )
 
+async def merge_pending_clicks(stats: dict) -> dict:
+    """Добавляет к статистике из БД переходы, которые ещё не записаны в БД"""
+    pending_count, pending_last = await get_pending_clicks(stats["short_code"])
+    if pending_count:
+        stats["access_count"] = (stats["access_count"] or 0) + pending_count
+    if pending_last and (
+        stats["last_accessed"] is None
+        or pending_last > datetime.fromisoformat(stats["last_accessed"])
+    ):
+        stats["last_accessed"] = pending_last.isoformat()
+    return stats
+
+# Преобразуем даты в строки для корректной сериализации
+def format_datetime(dt: datetime | None) -> str | None:
+    return dt.isoformat() if dt else None
+
+def serialize_link_stats(link) -> str:
+    """Статистика ссылки в JSON для кэша stats:{short_code}:{owner_id}"""
+    return json.dumps({
+        "id": link.id,
+        "short_code": link.short_code,
+        "original_url": link.original_url,
+        "created_at": format_datetime(link.created_at),
+        "expires_at": format_datetime(link.expires_at),
+        "owner_id": link.owner_id,
+        "access_count": link.access_count,
+        "last_accessed": format_datetime(link.last_accessed)
+    })
+
+async def load_link_stats(sessions, short_code: str, owner_id: int) -> str:
+    """Собирает статистику ссылки из БД в своей сессии и кэширует её в Redis"""
+    # Ищем ссылку в базе данных
+    link = await read_for_cache(
+        sessions, f"stats:{short_code}:{owner_id}",
+        lambda db: async_crud_link.get_user_link(db, short_code, owner_id)
+    )
+
+    if not link:
+        raise HTTPException(status_code=404, detail="Link not found or access denied")
+
+    stats = serialize_link_stats(link)
+    await async_redis_client.setex(f"stats:{short_code}:{owner_id}", settings.STATS_CACHE_TTL_SECONDS, stats)
+    return stats
+
+async def load_click_series(
+        short_code: str,
+        start: datetime | None,
+        end: datetime | None,
+        granularity: str) -> list[dict]:
+    """Временной ряд переходов из свёрток в Redis, границы приводятся к UTC"""
+    if start and start.tzinfo:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and end.tzinfo:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=1)
+    try:
+        return await get_click_series(short_code, granularity, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.get("/{short_code}/stats", response_model=LinkStats)
-def get_link_stats(
+async def get_link_stats(
     short_code:str,
+    from_: Optional[datetime] = Query(None, alias="from", description="Начало временного ряда"),
+    to: Optional[datetime] = Query(None, description="Конец временного ряда, по умолчанию сейчас"),
+    granularity: Optional[Literal["minute", "hour", "day"]] = Query(None, description="Размер корзины ряда"),
     current_user: UserInDB = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    sessions = Depends(get_read_sessions)
 ):
     """
     Возвращает статистику переходов по ссылкам для авторизованного пользователя.
+    С любым из параметров from, to, granularity добавляет временной ряд переходов
+    (по умолчанию почасовой за последние сутки)
     short_code: короткое название для ссылки
     current_user: текущий пользователь в сессии
-    db: указание базы данных
+    sessions: фабрика сессий чтения для пересборки кэша
     """
     try:
         cache_key = f"stats:{short_code}:{current_user.id}"
-    
+
         # Проверяем кэш Redis
-        cached_stats = redis_client.get(cache_key)
-        if cached_stats:
-            return json.loads(cached_stats)
-        
-        # Ищем ссылку в базе данных
-        link = db.query(Link).filter(
-            Link.short_code == short_code,
-            Link.owner_id == current_user.id
-        ).first()
-        
-        if not link:
-            raise HTTPException(status_code=404, detail="Link not found or access denied")
-        
-        # Преобразуем даты в строки для корректной сериализации
-        def format_datetime(dt: datetime | None) -> str | None:
-            return dt.isoformat() if dt else None
-
-        # Формируем статистику
-        stats = {
-            "id": link.id,
-            "short_code": link.short_code,
-            "original_url": link.original_url,
-            "created_at": format_datetime(link.created_at),
-            "expires_at": format_datetime(link.expires_at),
-            "owner_id": link.owner_id,
-            "access_count": link.access_count,
-            "last_accessed": format_datetime(link.last_accessed)
-        }
-        
-        # Кэшируем результат на 5 минут
-        redis_client.setex(cache_key, 300, json.dumps(stats))
+        cached_stats, pttl = await get_with_ttl(cache_key)
+        cache_lookups.inc("stats", "hit" if cached_stats else "miss")
+        if cached_stats and not should_refresh_early("stats", pttl):
+            stats = cached_stats
+        else:
+            stats = await rebuild_once(
+                cache_key,
+                lambda: load_link_stats(sessions, short_code, current_user.id),
+                lambda: async_redis_client.get(cache_key),
+                stale=cached_stats,
+            )
+        stats = await merge_pending_clicks(json.loads(stats))
+
+        if from_ or to or granularity:
+            stats["timeseries"] = await load_click_series(short_code, from_, to, granularity or "hour")
         return stats
     except Exception as e:
         logger.error(f"Failed to get link stats: {e}")
         raise
 
 @router.get("/links/search", response_model=LinkResponse)
-def search_link_by_url(
+async def search_link_by_url(
     original_url: str = Query(..., description="Оригинальный URL для поиска"),
-    db: Session = Depends(get_db)
+    sessions = Depends(get_read_sessions)
 ):
     """
     Поиск ссылки по оригинальному URL. Доступно всем пользователям
     original_url: оригинальная ссылка
-    db: указание базы данных
+    sessions: фабрика сессий чтения для пересборки кэша
     """
-    cache_key = f"search:{original_url}"
-    
+    # Ключ фиксированной длины вместо произвольно длинного URL
+    cache_key = f"search:{url_hash(original_url)}"
+
     # Проверяем кэш Redis
-    cached_link = redis_client.get(cache_key)
+    cached_link = await async_redis_client.get(cache_key)
+    cache_lookups.inc("search", "hit" if cached_link else "miss")
     if cached_link:
         return json.loads(cached_link)
-    
-    link = db.query(Link).filter(
-        Link.original_url == original_url
-    ).first()
-    
+
+    link = await read_for_cache(
+        sessions, cache_key,
+        lambda db: async_crud_link.get_link_by_original_url(db, original_url)
+    )
+
     if not link:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Link not found"
         )
-    
+
     # Возвращаем информацию о ссылке
     response = {
                 "short_code": link.short_code,
                 "original_url": link.original_url,
                 }
-    redis_client.setex(cache_key, 300, json.dumps(response))
+    await async_redis_client.setex(cache_key, settings.SEARCH_CACHE_TTL_SECONDS, json.dumps(response))
     return response
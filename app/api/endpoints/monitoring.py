@@ -0,0 +1,97 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.redis import local_caches, redis_pool, async_redis_pool, async_redis_client
+from app.core.tasks import CLUSTER_JOBS
+from app.core.bloom import short_code_index
+from app.core.pool_metrics import db_pool_stats, redis_pool_stats
+from app.core.security import password_hasher
+from app.core.metrics import Gauge, render_metrics
+from app.db.session import engine, async_engine, replicas
+
+router = APIRouter(prefix="/monitoring", tags=["monitoring"])
+# /metrics без префикса, как ожидает Prometheus
+metrics_router = APIRouter(tags=["monitoring"])
+
+POOLS = {
+    ("db", "async"): lambda: db_pool_stats(async_engine.pool),
+    ("db", "sync"): lambda: db_pool_stats(engine.pool),
+    ("redis", "async"): lambda: redis_pool_stats(async_redis_pool),
+    ("redis", "sync"): lambda: redis_pool_stats(redis_pool),
+    **{
+        ("db", f"replica{index}"): lambda replica=replica: db_pool_stats(replica.pool)
+        for index, replica in enumerate(replicas.engines)
+    },
+}
+
+def pool_gauge(field: str) -> dict[tuple, float]:
+    return {labels: stats()[field] for labels, stats in POOLS.items()}
+
+Gauge("pool_connections_in_use", "Checked out pool connections", ("backend", "pool"),
+      lambda: pool_gauge("checked_out"))
+Gauge("pool_connections_idle", "Idle pool connections", ("backend", "pool"), lambda: pool_gauge("idle"))
+Gauge("pool_checkout_timeouts", "Pool checkouts that timed out", ("backend", "pool"), lambda: pool_gauge("timeouts"))
+Gauge("pool_connection_errors", "Pool checkouts that failed to connect", ("backend", "pool"),
+      lambda: pool_gauge("connection_errors"))
+Gauge("pool_checkout_wait_seconds_max", "Longest wait for a pool connection", ("backend", "pool"),
+      lambda: pool_gauge("wait_seconds_max"))
+Gauge("password_hasher_pending", "bcrypt jobs running or queued", (),
+      lambda: {(): password_hasher.pending})
+Gauge("l1_cache_entries", "Entries in process-local caches", ("cache",),
+      lambda: {(name,): cache.stats()["entries"] for name, cache in local_caches.items()})
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Метрики текущего воркера в текстовом формате Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/cache")
+def get_cache_stats():
+    """
+    Возвращает счётчики L1-кэшей текущего воркера: попадания, промахи, вытеснения.
+    Используется для подбора размера кэша
+    """
+    return {name: cache.stats() for name, cache in local_caches.items()}
+
+@router.get("/bloom")
+def get_bloom_stats():
+    """
+    Возвращает состояние фильтра Блума по коротким кодам текущего воркера:
+    число кодов, занимаемую память и оценку доли ложных срабатываний
+    """
+    return short_code_index.stats()
+
+@router.get("/pools")
+def get_pool_stats():
+    """
+    Возвращает состояние пулов соединений БД и Redis текущего воркера:
+    выданные, свободные и overflow-соединения, время ожидания соединения,
+    и доступность реплик для чтения
+    """
+    return {
+        "db": {
+            "async": db_pool_stats(async_engine.pool),
+            "sync": db_pool_stats(engine.pool),
+            **{f"replica{index}": db_pool_stats(replica.pool) for index, replica in enumerate(replicas.engines)},
+        },
+        "replicas": replicas.stats(),
+        "redis": {
+            "async": redis_pool_stats(async_redis_pool),
+            "sync": redis_pool_stats(redis_pool),
+        },
+        "password_hasher": password_hasher.stats(),
+    }
+
+@router.get("/jobs")
+async def get_jobs_stats():
+    """
+    Возвращает последний запуск общих задач кластера:
+    когда и где запускались, сколько длились и сколько строк обработали
+    """
+    pipe = async_redis_client.pipeline(transaction=False)
+    for name in CLUSTER_JOBS:
+        pipe.hgetall(f"jobs:last_run:{name}")
+    runs = await pipe.execute()
+    return {
+        name: {key.decode(): value.decode() for key, value in run.items()} or None
+        for name, run in zip(CLUSTER_JOBS, runs)
+    }
@@ -0,0 +1,73 @@
+"""
+Быстрый путь редиректа: ASGI-middleware отвечает на GET /links/{short_code}
+из кэша (L1 или Redis) до маршрутизации FastAPI - без зависимостей, сессии БД
+и pydantic. URL из кэша уже в байтах и сразу идёт в заголовок Location.
+Промах, устаревающая запись и отсутствующий код уходят в redirect_to_original,
+которому передаётся результат уже выполненного чтения кэша
+"""
+
+from starlette.datastructures import Headers
+from app.core.clicks import track_click
+from app.core.config import settings
+from app.core.redis import get_cached_url, REDIRECT_NOT_FOUND
+from app.schemas.link import RESERVED_ALIASES
+
+REDIRECT_STATUS_CODES = {301, 302, 307, 308}
+REDIRECT_PREFIX = "/links/"
+# Ключ в scope["state"] с результатом get_cached_url для полного обработчика
+LOOKUP_STATE_KEY = "redirect_lookup"
+
+
+def redirect_headers() -> list[tuple[bytes, bytes]]:
+    """Заголовки ответа редиректа, кроме Location"""
+    if settings.REDIRECT_STATUS_CODE not in REDIRECT_STATUS_CODES:
+        raise ValueError(f"Unsupported redirect status code: {settings.REDIRECT_STATUS_CODE}")
+    headers = [(b"content-length", b"0")]
+    if settings.REDIRECT_CACHE_CONTROL:
+        headers.append((b"cache-control", settings.REDIRECT_CACHE_CONTROL.encode()))
+    return headers
+
+
+class RedirectMiddleware:
+    """Отдаёт попадания в кэш редиректов, остальное передаёт приложению"""
+
+    def __init__(self, app, route=None):
+        self.app = app
+        # Маршрут полного обработчика: по нему метрики подписывают ответы быстрого пути
+        self.route = route
+        self.status_code = settings.REDIRECT_STATUS_CODE
+        self.headers = redirect_headers()
+
+    async def __call__(self, scope, receive, send):
+        short_code = self._short_code(scope)
+        if short_code is None:
+            await self.app(scope, receive, send)
+            return
+
+        cached_url, refresh = await get_cached_url(short_code)
+        if cached_url is None or refresh or cached_url == REDIRECT_NOT_FOUND:
+            scope.setdefault("state", {})[LOOKUP_STATE_KEY] = (cached_url, refresh)
+            await self.app(scope, receive, send)
+            return
+
+        track_click(Headers(scope=scope), short_code)
+        if self.route is not None:
+            scope["route"] = self.route
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": [(b"location", cached_url), *self.headers],
+        })
+        await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    def _short_code(scope) -> str | None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return None
+        path = scope["path"]
+        if not path.startswith(REDIRECT_PREFIX):
+            return None
+        short_code = path[len(REDIRECT_PREFIX):]
+        if not short_code or "/" in short_code or short_code in RESERVED_ALIASES:
+            return None
+        return short_code
@@ -0,0 +1,164 @@
+"""
+Вероятностный индекс существующих коротких кодов (счётный фильтр Блума).
+Отрицательный ответ точный, поэтому запросы несуществующих кодов не доходят до БД.
+Фильтр строится из БД на старте и периодически, а между перестроениями
+обновляется при создании и удалении ссылок (см. app/core/redis.py)
+"""
+
+import hashlib
+import math
+import threading
+import time
+from sqlalchemy import select, func
+from app.core.config import settings
+from app.core.logger import logger
+from app.db.models import Link
+
+
+class CountingBloomFilter:
+    """
+    Фильтр Блума с 8-битными счётчиками вместо битов, поэтому поддерживает удаление.
+    Насыщенный счётчик (255) больше не уменьшается, чтобы не получить ложный отрицательный ответ
+    """
+
+    def __init__(self, expected_items: int, fp_rate: float):
+        expected_items = max(expected_items, 1)
+        self.size = max(int(-expected_items * math.log(fp_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / expected_items * math.log(2)), 1)
+        self.items = 0
+        self._counters = bytearray(self.size)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            if self._counters[position] < 255:
+                self._counters[position] += 1
+        self.items += 1
+
+    def remove(self, item: str):
+        positions = self._positions(item)
+        # Элемента точно нет в фильтре, уменьшение сломало бы счётчики других
+        if not all(self._counters[position] for position in positions):
+            return
+        for position in positions:
+            if self._counters[position] < 255:
+                self._counters[position] -= 1
+        self.items = max(self.items - 1, 0)
+
+    def __contains__(self, item: str) -> bool:
+        counters = self._counters
+        return all(counters[position] for position in self._positions(item))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._counters)
+
+    @property
+    def estimated_fp_rate(self) -> float:
+        return (1 - math.exp(-self.hash_count * self.items / self.size)) ** self.hash_count
+
+
+class ShortCodeIndex:
+    """
+    Обёртка над фильтром для коротких кодов. Пока фильтр не построен,
+    считает, что любой код может существовать
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.negative_lookups = 0
+        self.last_rebuild_seconds = None
+        self.built_at = 0.0
+        self._filter: CountingBloomFilter | None = None
+        self._rebuilding = False
+        self._stale = False
+        self._added_during_rebuild: list[str] = []
+        self._lock = threading.Lock()
+
+    def might_exist(self, short_code: str) -> bool:
+        if not self.ready or short_code in self._filter:
+            return True
+        self.negative_lookups += 1
+        return False
+
+    def add(self, short_code: str):
+        with self._lock:
+            if self._rebuilding:
+                self._added_during_rebuild.append(short_code)
+            if self._filter is not None:
+                self._filter.add(short_code)
+
+    def remove(self, short_code: str):
+        with self._lock:
+            # Во время перестроения удалённый код может попасть в новый фильтр,
+            # лишнее срабатывание безопасно, а вычитание несуществующего - нет
+            if self._filter is not None and not self._rebuilding:
+                self._filter.remove(short_code)
+
+    def invalidate(self):
+        """
+        Помечает индекс устаревшим (события могли потеряться).
+        Идущее перестроение тоже не сделает его готовым
+        """
+        with self._lock:
+            self.ready = False
+            self._stale = self._rebuilding
+
+    def rebuild(self, db):
+        """
+        Строит новый фильтр по всем кодам из БД и подменяет текущий.
+        Истёкшие, но ещё не удалённые коды тоже попадают в фильтр: при очистке
+        для них придёт событие удаления, и без них оно уменьшило бы чужие счётчики
+        """
+        started = time.monotonic()
+        with self._lock:
+            self._rebuilding = True
+            self._stale = False
+            self._added_during_rebuild = []
+        try:
+            count = db.execute(select(func.count()).select_from(Link)).scalar()
+            new_filter = CountingBloomFilter(
+                max(settings.BLOOM_EXPECTED_ITEMS, count * 2), settings.BLOOM_FP_RATE
+            )
+            codes = db.execute(
+                select(Link.short_code).execution_options(yield_per=10_000)
+            ).scalars()
+            for short_code in codes:
+                new_filter.add(short_code)
+            with self._lock:
+                for short_code in self._added_during_rebuild:
+                    new_filter.add(short_code)
+                self._filter = new_filter
+                self.ready = not self._stale
+        finally:
+            with self._lock:
+                self._rebuilding = False
+                self._added_during_rebuild = []
+        self.built_at = time.monotonic()
+        self.last_rebuild_seconds = self.built_at - started
+        logger.info(
+            f"Short code filter rebuilt: {new_filter.items} codes, "
+            f"{new_filter.memory_bytes} bytes, {self.last_rebuild_seconds:.2f}s"
+        )
+
+    def stats(self) -> dict:
+        if self._filter is None:
+            return {"ready": False}
+        return {
+            "ready": self.ready,
+            "items": self._filter.items,
+            "counters": self._filter.size,
+            "hash_functions": self._filter.hash_count,
+            "memory_bytes": self._filter.memory_bytes,
+            "estimated_fp_rate": self._filter.estimated_fp_rate,
+            "negative_lookups": self.negative_lookups,
+            "last_rebuild_seconds": self.last_rebuild_seconds,
+        }
+
+
+short_code_index = ShortCodeIndex()
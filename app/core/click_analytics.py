@@ -0,0 +1,208 @@
+"""
+Временные ряды переходов по ссылкам.
+Редирект только кладёт событие в буфер процесса. Фоновая задача flush_clicks
+сворачивает события в поминутные, почасовые и посуточные корзины
+(хэши Redis с ограниченным сроком хранения), из них строится ответ /stats
+"""
+
+import calendar
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.core.redis import redis_client, async_redis_client
+
+# Корзина: (длина корзины, длина периода одного ключа Redis, срок хранения) в секундах.
+# Один ключ хранит все корзины периода, поэтому запрос ряда читает несколько ключей
+GRANULARITIES = {
+    "minute": (60, 86400, settings.CLICK_SERIES_MINUTE_RETENTION_DAYS * 86400),
+    "hour": (3600, 30 * 86400, settings.CLICK_SERIES_HOUR_RETENTION_DAYS * 86400),
+    "day": (86400, 365 * 86400, settings.CLICK_SERIES_DAY_RETENTION_DAYS * 86400),
+}
+
+BOT_MARKERS = ("bot", "crawler", "spider", "slurp", "curl", "wget", "python-requests", "httpx")
+TABLET_MARKERS = ("ipad", "tablet")
+MOBILE_MARKERS = ("mobi", "iphone", "android")
+COUNTRY_CODE = re.compile(r"[A-Z]{2}")
+MAX_HOST_LENGTH = 253
+
+
+class ClickEventBuffer:
+    """Ограниченный буфер событий переходов (short_code, время, referrer, user agent, страна)"""
+
+    def __init__(self, max_events: int):
+        self.max_events = max_events
+        self.dropped = 0
+        self._events: list[tuple] = []
+        self._lock = threading.Lock()
+
+    def add(self, event: tuple):
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append(event)
+
+    def drain(self) -> list[tuple]:
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+    def restore(self, events: list[tuple]):
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+click_events = ClickEventBuffer(settings.CLICK_EVENTS_MAX)
+
+
+@lru_cache(maxsize=4096)
+def classify_user_agent(user_agent: str | None) -> str:
+    """Класс клиента по User-Agent: bot, tablet, mobile, desktop или unknown"""
+    if not user_agent:
+        return "unknown"
+    user_agent = user_agent.lower()
+    if any(marker in user_agent for marker in BOT_MARKERS):
+        return "bot"
+    if any(marker in user_agent for marker in TABLET_MARKERS):
+        return "tablet"
+    if any(marker in user_agent for marker in MOBILE_MARKERS):
+        return "mobile"
+    return "desktop"
+
+
+@lru_cache(maxsize=4096)
+def referrer_host(referrer: str | None) -> str:
+    """Хост источника перехода, direct для переходов без Referer"""
+    if not referrer:
+        return "direct"
+    try:
+        host = urlsplit(referrer).hostname
+    except ValueError:
+        return "unknown"
+    if not host or len(host) > MAX_HOST_LENGTH:
+        return "unknown"
+    return host
+
+
+@lru_cache(maxsize=1024)
+def country_code(country: str | None) -> str:
+    """Двухбуквенный код страны из заголовка CDN, иначе unknown"""
+    country = (country or "").strip().upper()
+    return country if COUNTRY_CODE.fullmatch(country) else "unknown"
+
+
+def _timestamp(dt: datetime) -> int:
+    return calendar.timegm(dt.utctimetuple())
+
+
+def _series_key(short_code: str, granularity: str, period_start: int) -> str:
+    return f"clicks:ts:{short_code}:{granularity}:{period_start}"
+
+
+def rollup_click_events(events: list[tuple]) -> dict[str, Counter]:
+    """Сворачивает события в счётчики корзин всех гранулярностей: ключ Redis -> поле -> кол-во"""
+    rollups: dict[str, Counter] = defaultdict(Counter)
+    for short_code, clicked_at, referrer, user_agent, country in events:
+        dimensions = (
+            "total",
+            f"ref:{referrer_host(referrer)}",
+            f"ua:{classify_user_agent(user_agent)}",
+            f"country:{country_code(country)}",
+        )
+        for granularity, (bucket_seconds, period_seconds, _) in GRANULARITIES.items():
+            bucket = int(clicked_at) // bucket_seconds * bucket_seconds
+            fields = rollups[_series_key(short_code, granularity, bucket - bucket % period_seconds)]
+            for dimension in dimensions:
+                fields[f"{bucket}:{dimension}"] += 1
+    return rollups
+
+
+# Счётчики хостов-источников одного ключа периода. Новый хост корзины получает своё
+# поле, пока в корзине меньше ARGV[1] хостов (счётчик {bucket}:refs), иначе
+# переход учитывается в {bucket}:ref:other. ARGV дальше - тройки bucket, host, count
+_INCREMENT_REFERRERS = """
+local limit = tonumber(ARGV[1])
+for i = 2, #ARGV, 3 do
+    local field = ARGV[i] .. ":ref:" .. ARGV[i + 1]
+    if redis.call("hexists", KEYS[1], field) == 0 then
+        if redis.call("hincrby", KEYS[1], ARGV[i] .. ":refs", 1) > limit then
+            field = ARGV[i] .. ":ref:other"
+        end
+    end
+    redis.call("hincrby", KEYS[1], field, ARGV[i + 2])
+end
+"""
+
+
+def push_click_events(events: list[tuple]):
+    """
+    Записывает свёрнутые события в Redis одним pipeline и продлевает срок хранения ключей.
+    Хостов-источников в корзине не больше CLICK_SERIES_MAX_REFERRERS, частые занимают места первыми
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for key, fields in rollup_click_events(events).items():
+        granularity, period_start = key.rsplit(":", 2)[1:]
+        _, period_seconds, retention_seconds = GRANULARITIES[granularity]
+        referrers = []
+        for field, count in fields.most_common():
+            bucket, dimension = field.split(":", 1)
+            if dimension.startswith("ref:"):
+                referrers += [bucket, dimension[4:], count]
+            else:
+                pipe.hincrby(key, field, count)
+        if referrers:
+            pipe.eval(_INCREMENT_REFERRERS, 1, key, settings.CLICK_SERIES_MAX_REFERRERS, *referrers)
+        pipe.expireat(key, int(period_start) + period_seconds + retention_seconds)
+    pipe.execute()
+
+
+async def get_click_series(
+        short_code: str,
+        granularity: str,
+        start: datetime,
+        end: datetime) -> list[dict]:
+    """
+    Ряд переходов по корзинам [start, end] из свёрток, включая пустые корзины.
+    Бросает ValueError, если корзин больше CLICK_SERIES_MAX_POINTS
+    """
+    bucket_seconds, period_seconds, _ = GRANULARITIES[granularity]
+    first = _timestamp(start) // bucket_seconds * bucket_seconds
+    last = _timestamp(end) // bucket_seconds * bucket_seconds
+    if last < first:
+        raise ValueError("'from' must not be later than 'to'")
+    if (last - first) // bucket_seconds + 1 > settings.CLICK_SERIES_MAX_POINTS:
+        raise ValueError(f"Too many points, at most {settings.CLICK_SERIES_MAX_POINTS} allowed")
+
+    periods = range(first - first % period_seconds, last + 1, period_seconds)
+    pipe = async_redis_client.pipeline(transaction=False)
+    for period_start in periods:
+        pipe.hgetall(_series_key(short_code, granularity, period_start))
+
+    buckets = {
+        bucket: {"clicks": 0, "referrers": {}, "user_agents": {}, "countries": {}}
+        for bucket in range(first, last + 1, bucket_seconds)
+    }
+    groups = {"ref": "referrers", "ua": "user_agents", "country": "countries"}
+    for fields in await pipe.execute():
+        for field, count in fields.items():
+            bucket, dimension = field.decode().split(":", 1)
+            if (point := buckets.get(int(bucket))) is None:
+                continue
+            if dimension == "total":
+                point["clicks"] = int(count)
+            elif dimension != "refs":
+                group, value = dimension.split(":", 1)
+                point[groups[group]][value] = int(count)
+
+    epoch = datetime(1970, 1, 1)
+    return [
+        {"start": epoch + timedelta(seconds=bucket), **point}
+        for bucket, point in buckets.items()
+    ]
@@ -0,0 +1,190 @@
+"""
+Буферизация переходов по ссылкам.
+Редирект только увеличивает счётчик в памяти процесса. Фоновые задачи
+(см. app/core/tasks.py) переносят счётчики в общие для всех воркеров
+хэши Redis, а оттуда пачками в БД
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.redis import redis_client, async_redis_client
+from app.core.click_analytics import click_events
+
+PENDING_COUNT_KEY = "clicks:pending:count"
+PENDING_LAST_KEY = "clicks:pending:last"
+# clicks:draining:{count|last}:{unix-время}:{uuid} - переходы, которые пишутся в БД
+DRAINING_PREFIX = "clicks:draining:"
+
+
+class ClickBuffer:
+    """
+    Ограниченный буфер переходов: short_code -> [кол-во переходов, время последнего перехода].
+    Переходы по одному коду схлопываются в одну запись, поэтому размер буфера
+    зависит только от числа разных кодов между сбросами
+    """
+
+    def __init__(self, max_codes: int):
+        self.max_codes = max_codes
+        self.dropped = 0
+        self._pending: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, short_code: str, count: int = 1, accessed_at: datetime | None = None) -> bool:
+        """Добавляет переходы в буфер. Возвращает False, если буфер переполнен"""
+        accessed_at = accessed_at or datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(short_code)
+            if entry is None:
+                if len(self._pending) >= self.max_codes:
+                    self.dropped += count
+                    return False
+                self._pending[short_code] = [count, accessed_at]
+            else:
+                entry[0] += count
+                if accessed_at > entry[1]:
+                    entry[1] = accessed_at
+        return True
+
+    def drain(self) -> dict[str, tuple[int, datetime]]:
+        """Забирает все накопленные переходы и очищает буфер"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return {code: (count, accessed_at) for code, (count, accessed_at) in pending.items()}
+
+    def restore(self, pending: dict[str, tuple[int, datetime]]):
+        """Возвращает в буфер переходы, которые не удалось записать"""
+        for short_code, (count, accessed_at) in pending.items():
+            self.add(short_code, count, accessed_at)
+
+    def peek(self, short_code: str) -> tuple[int, datetime | None]:
+        """Возвращает ещё не сброшенные переходы по коду"""
+        with self._lock:
+            entry = self._pending.get(short_code)
+            return (entry[0], entry[1]) if entry else (0, None)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+click_buffer = ClickBuffer(settings.CLICK_BUFFER_MAX_CODES)
+
+
+def record_click(
+        short_code: str,
+        referrer: str | None = None,
+        user_agent: str | None = None,
+        country: str | None = None):
+    """
+    Учитывает переход по ссылке без обращения к БД и Redis.
+    Событие для временных рядов разбирается позже, в фоновой задаче
+    """
+    click_buffer.add(short_code)
+    click_events.add((short_code, time.time(), referrer, user_agent, country))
+
+
+def track_click(headers, short_code: str):
+    """Учитывает переход с данными клиента из заголовков запроса"""
+    country = headers.get(settings.CLICK_COUNTRY_HEADER) if settings.CLICK_COUNTRY_HEADER else None
+    record_click(short_code, headers.get("referer"), headers.get("user-agent"), country)
+
+
+def _to_score(dt: datetime) -> float:
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+def _from_score(score: float) -> datetime:
+    return datetime.fromtimestamp(score, timezone.utc).replace(tzinfo=None)
+
+
+def push_pending_clicks(pending: dict[str, tuple[int, datetime]]):
+    """Переносит переходы в Redis одним pipeline: HINCRBY счётчика и ZADD GT времени"""
+    pipe = redis_client.pipeline(transaction=False)
+    for short_code, (count, accessed_at) in pending.items():
+        pipe.hincrby(PENDING_COUNT_KEY, short_code, count)
+        pipe.zadd(PENDING_LAST_KEY, {short_code: _to_score(accessed_at)}, gt=True)
+    pipe.execute()
+
+
+# Переносит накопленные ключи во временные. Отсутствующий ключ (например, ZSET
+# без HASH) пропускается, а не роняет RENAME
+_TAKE_PENDING = """
+local taken = 0
+if redis.call("exists", KEYS[1]) == 1 then
+    redis.call("rename", KEYS[1], KEYS[3])
+    taken = 1
+end
+if redis.call("exists", KEYS[2]) == 1 then
+    redis.call("rename", KEYS[2], KEYS[4])
+end
+return taken
+"""
+
+
+def _draining_keys(suffix: str) -> list[str]:
+    return [f"{DRAINING_PREFIX}count:{suffix}", f"{DRAINING_PREFIX}last:{suffix}"]
+
+
+def _stale_draining_suffixes(now: float) -> list[str]:
+    """Суффиксы временных ключей, оставшихся от упавших запусков"""
+    suffixes = []
+    for key in redis_client.scan_iter(match=f"{DRAINING_PREFIX}count:*", count=1000):
+        suffix = key.decode().removeprefix(f"{DRAINING_PREFIX}count:")
+        started, _, _ = suffix.partition(":")
+        if not started.isdigit() or int(started) < now - settings.CLICK_DRAINING_STALE_SECONDS:
+            suffixes.append(suffix)
+    return suffixes
+
+
+def take_pending_clicks() -> tuple[dict[str, tuple[int, datetime]], list[str]]:
+    """
+    Атомарно забирает накопленные в Redis переходы (RENAME во временные ключи
+    Lua-скриптом), чтобы новые клики продолжали копиться параллельно с записью в БД.
+    Заодно забирает временные ключи, брошенные упавшим запуском.
+    Возвращает переходы и временные ключи, которые нужно удалить после записи
+    """
+    now = time.time()
+    suffixes = _stale_draining_suffixes(now)
+    suffix = f"{int(now)}:{uuid.uuid4().hex}"
+    if redis_client.eval(_TAKE_PENDING, 4, PENDING_COUNT_KEY, PENDING_LAST_KEY, *_draining_keys(suffix)):
+        suffixes.append(suffix)
+    if not suffixes:
+        return {}, []
+
+    pipe = redis_client.pipeline(transaction=False)
+    for suffix in suffixes:
+        count_key, last_key = _draining_keys(suffix)
+        pipe.hgetall(count_key)
+        pipe.zrange(last_key, 0, -1, withscores=True)
+    results = pipe.execute()
+
+    pending = {}
+    for counts, last_accessed in zip(results[::2], results[1::2]):
+        last_accessed = {code.decode(): score for code, score in last_accessed}
+        for code, count in counts.items():
+            code = code.decode()
+            score = last_accessed.get(code)
+            accessed_at = _from_score(score) if score else datetime.utcnow()
+            previous_count, previous_at = pending.get(code, (0, accessed_at))
+            pending[code] = (previous_count + int(count), max(previous_at, accessed_at))
+
+    draining_keys = [key for suffix in suffixes for key in _draining_keys(suffix)]
+    return pending, draining_keys
+
+
+async def get_pending_clicks(short_code: str) -> tuple[int, datetime | None]:
+    """
+    Переходы по коду, которые ещё не записаны в БД:
+    накопленные в Redis и в буфере текущего процесса
+    """
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.hget(PENDING_COUNT_KEY, short_code)
+    pipe.zscore(PENDING_LAST_KEY, short_code)
+    count, score = await pipe.execute()
+
+    local_count, local_last = click_buffer.peek(short_code)
+    last_accessed = _from_score(score) if score else None
+    if local_last and (last_accessed is None or local_last > last_accessed):
+        last_accessed = local_last
+    return int(count or 0) + local_count, last_accessed
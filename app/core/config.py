@@ -11,6 +11,116 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD:str
     POSTGRES_DB:str
 
+    # Пул соединений с БД
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+
+    # Реплики для чтения через запятую: читающие эндпоинты и пересборка общих кэшей в Redis.
+    # Реплика, с которой потеряно соединение, исключается на DB_REPLICA_RETRY_SECONDS.
+    # После записи пользователь и сброшенные ключи кэша DB_READ_YOUR_WRITES_SECONDS
+    # читаются из основной БД
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_RETRY_SECONDS: int = 30
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+
+    # Пул соединений с Redis
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: int = 5
+
+    # Генерация коротких кодов: sequence, snowflake или random
+    SHORT_CODE_STRATEGY: str = "sequence"
+    SHORT_CODE_BLOCK_SIZE: int = 1000
+    # Ключ перестановки кодов sequence (по умолчанию SECRET_KEY). Смена ключа меняет
+    # порядок выдачи, уже выданные коды могут повториться и будут пересозданы при конфликте
+    SHORT_CODE_SECRET: str | None = None
+    SHORT_CODE_WORKER_ID: int | None = None
+    # Срок аренды номера воркера snowflake в Redis, продлевается при генерации
+    SHORT_CODE_WORKER_ID_TTL_SECONDS: int = 60
+
+    # Пакетное создание ссылок
+    LINK_BATCH_MAX_ITEMS: int = 5000
+    LINK_BATCH_CHUNK_SIZE: int = 1000
+    # Максимум строк в потоковом NDJSON-варианте: тело разбирается целиком до записи
+    LINK_STREAM_MAX_ITEMS: int = 100_000
+    # Максимум кодов в пакетном удалении и изменении
+    LINK_BULK_MAX_CODES: int = 1000
+
+    # Список ссылок владельца: размер страницы и TTL кэша первых страниц
+    USER_LINKS_PAGE_MAX: int = 100
+    USER_LINKS_CACHE_TTL_SECONDS: int = 60
+
+    # Повторное сокращение того же URL тем же владельцем возвращает существующую ссылку
+    LINK_DEDUPLICATE_PER_OWNER: bool = False
+    SEARCH_CACHE_TTL_SECONDS: int = 300
+
+    # Общие задачи (удаление ссылок, запись переходов) можно вынести в worker.py
+    RUN_CLUSTER_JOBS_IN_API: bool = True
+
+    # Удаление устаревших ссылок
+    PURGE_BATCH_SIZE: int = 1000
+    PURGE_TIME_BUDGET_SECONDS: int = 20
+
+    # Буферизация счётчиков переходов
+    CLICK_FLUSH_INTERVAL_SECONDS: int = 5
+    CLICK_RECONCILE_INTERVAL_SECONDS: int = 30
+    CLICK_FLUSH_BATCH_SIZE: int = 500
+    CLICK_BUFFER_MAX_CODES: int = 100_000
+    # Временные ключи clicks:draining:* старше этого срока остались от упавшего запуска
+    # и забираются следующим reconcile_clicks
+    CLICK_DRAINING_STALE_SECONDS: int = 300
+
+    # Временные ряды переходов: буфер событий, срок хранения корзин и предел точек в ответе
+    CLICK_EVENTS_MAX: int = 200_000
+    CLICK_SERIES_MINUTE_RETENTION_DAYS: int = 2
+    CLICK_SERIES_HOUR_RETENTION_DAYS: int = 90
+    CLICK_SERIES_DAY_RETENTION_DAYS: int = 730
+    CLICK_SERIES_MAX_POINTS: int = 1500
+    # Сколько разных хостов-источников хранится в корзине, остальные идут в other
+    CLICK_SERIES_MAX_REFERRERS: int = 50
+    # Заголовок со страной клиента от CDN/балансировщика (например CF-IPCountry)
+    CLICK_COUNTRY_HEADER: str | None = None
+
+    # Кэш редиректов в Redis
+    REDIRECT_CACHE_TTL_SECONDS: int = 3600
+    REDIRECT_NEGATIVE_TTL_SECONDS: int = 30
+    STATS_CACHE_TTL_SECONDS: int = 300
+
+    # Ответ редиректа: код (301, 302, 307 или 308) и Cache-Control (пусто - без заголовка).
+    # С 301/308 и max-age повторные переходы берёт на себя браузер или CDN,
+    # и до сервиса (и статистики переходов) они не доходят
+    REDIRECT_STATUS_CODE: int = 302
+    REDIRECT_CACHE_CONTROL: str = ""
+    # Попадания в кэш отдаются из ASGI-middleware в обход маршрутизации и зависимостей
+    REDIRECT_FAST_PATH: bool = True
+
+    # Защита от лавины промахов: блокировка пересборки записи и раннее обновление (XFetch)
+    CACHE_REBUILD_LOCK_MS: int = 3000
+    CACHE_REBUILD_POLL_MS: int = 25
+    CACHE_XFETCH_BETA: float = 1.0
+
+    # Фильтр Блума по существующим коротким кодам
+    BLOOM_EXPECTED_ITEMS: int = 1_000_000
+    BLOOM_FP_RATE: float = 0.01
+    BLOOM_REBUILD_INTERVAL_SECONDS: int = 3600
+
+    # L1-кэш редиректов в памяти процесса
+    L1_CACHE_MAX_ENTRIES: int = 10_000
+    L1_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    L1_CACHE_TTL_SECONDS: int = 60
+
+    # Отдельный пул для bcrypt: число потоков и предел очереди, сверх которого ответ 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # Кэши проверенных токенов и пользователей в памяти процесса
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    AUTH_CACHE_MAX_BYTES: int = 4 * 1024 * 1024
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 3600
+    USER_CACHE_TTL_SECONDS: int = 60
+
     class Config:
         env_file = ".env"  
 
@@ -0,0 +1,190 @@
+"""
+Сброс кэшей после изменения ссылок и пользователей.
+Обработчик собирает все затронутые ключи в CacheInvalidation и выполняет
+их одним pipeline: UNLINK (освобождение памяти в фоне Redis), запись
+новых значений (write-through) и события для L1-кэшей и индекса кодов других воркеров.
+Там же ставятся метки недавней записи пользователя и сброшенных ключей кэша,
+по которым чтения идут в основную БД, а не в отстающие реплики
+"""
+
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable
+from app.core.config import settings
+from app.db.session import replicas
+from app.core.redis import (
+    async_redis_client, redis_client, redirect_cache, user_cache, redirect_ttl,
+    INVALIDATION_CHANNEL, SHORT_CODES_CHANNEL, USER_LINKS_VERSION_PREFIX
+)
+
+# recent_write:{email} и recent_write:{ключ кэша} живут DB_READ_YOUR_WRITES_SECONDS
+# после записи пользователя или сброса ключа
+RECENT_WRITE_PREFIX = "recent_write:"
+
+
+class CacheInvalidation:
+    """Набор ключей для сброса и значений для записи в рамках одного запроса или задачи"""
+
+    def __init__(self):
+        self._unlink: set[str] = set()
+        self._redirects: dict[str, tuple[str, int]] = {}
+        # dict как упорядоченное множество: одно событие на ключ
+        self._messages: dict[tuple[str, str], None] = {}
+        self._local: list[tuple] = []
+        self._writers: set[str] = set()
+        self._owners: set[int] = set()
+
+    def link(
+            self,
+            short_code: str,
+            owner_id: int | None = None,
+            removed: bool = False,
+            url_hashes: Iterable[str | None] = ()):
+        """
+        Ссылка изменилась или удалена: сбросить её редирект и статистику,
+        список ссылок владельца, поиск по прежнему и новому URL (url_hashes),
+        а удалённый код убрать из индекса коротких кодов
+        """
+        self._unlink.add(f"redirect:{short_code}")
+        self._unlink.update(f"search:{hashed}" for hashed in url_hashes if hashed)
+        self._add_message((INVALIDATION_CHANNEL, f"redirect:{short_code}"))
+        self._local.append((redirect_cache, short_code, None, None))
+        if owner_id is not None:
+            self._unlink.add(f"stats:{short_code}:{owner_id}")
+            self.owner_links(owner_id)
+        if removed:
+            self._add_message((SHORT_CODES_CHANNEL, f"-{short_code}"))
+
+    def created(self, short_code: str, original_url: str, expires_at: datetime | None, owner_id: int | None):
+        """Новая ссылка: записать редирект, добавить код в индекс, сбросить список владельца"""
+        self.write_redirect(short_code, original_url, expires_at)
+        self._add_message((SHORT_CODES_CHANNEL, f"+{short_code}"))
+        if owner_id is not None:
+            self.owner_links(owner_id)
+
+    def owner_links(self, owner_id: int):
+        """
+        Сбросить список ссылок владельца. Версия списка растёт, поэтому страница,
+        прочитанная из БД до сброса, уже не запишется в кэш
+        """
+        self._unlink.add(f"user_links:{owner_id}")
+        self._owners.add(owner_id)
+
+    def write_redirect(self, short_code: str, original_url: str, expires_at: datetime | None):
+        """
+        Write-through: сразу записать актуальный URL вместо сброса,
+        чтобы следующий переход не шёл в БД. Другие воркеры сбрасывают свой L1
+        """
+        self._add_message((INVALIDATION_CHANNEL, f"redirect:{short_code}"))
+        ttl = redirect_ttl(expires_at)
+        if ttl <= 0:
+            self._redirects.pop(short_code, None)
+            self._unlink.add(f"redirect:{short_code}")
+            self._local.append((redirect_cache, short_code, None, None))
+            return
+        self._redirects[short_code] = (original_url, ttl)
+        self._local.append((redirect_cache, short_code, original_url.encode(), ttl))
+
+    def user(self, email: str):
+        """Пользователь изменился: сбросить его во всех воркерах"""
+        self._add_message((INVALIDATION_CHANNEL, f"user:{email}"))
+        self._local.append((user_cache, email, None, None))
+        self.wrote(email)
+
+    def wrote(self, email: str):
+        """Пользователь что-то записал: его чтения пока идут в основную БД (только при репликах)"""
+        if replicas.engines:
+            self._writers.add(email)
+
+    def _add_message(self, message: tuple[str, str]):
+        self._messages[message] = None
+
+    def _fill(self, pipe):
+        # Записанный редирект не должен быть тут же удалён
+        unlink = self._unlink - {f"redirect:{code}" for code in self._redirects}
+        if unlink:
+            pipe.unlink(*unlink)
+        for short_code, (original_url, ttl) in self._redirects.items():
+            pipe.setex(f"redirect:{short_code}", ttl, original_url)
+        for owner_id in self._owners:
+            pipe.incr(f"{USER_LINKS_VERSION_PREFIX}{owner_id}")
+            pipe.expire(f"{USER_LINKS_VERSION_PREFIX}{owner_id}", settings.USER_LINKS_CACHE_TTL_SECONDS)
+        for email in self._writers:
+            pipe.setex(f"{RECENT_WRITE_PREFIX}{email}", settings.DB_READ_YOUR_WRITES_SECONDS, 1)
+        # Сброшенные и записанные ключи пересобираются из основной БД, пока реплики догоняют
+        if replicas.engines:
+            for key in self._unlink | {f"redirect:{code}" for code in self._redirects}:
+                pipe.setex(f"{RECENT_WRITE_PREFIX}{key}", settings.DB_READ_YOUR_WRITES_SECONDS, 1)
+        for channel, message in self._messages:
+            pipe.publish(channel, message)
+
+    def _apply_local(self):
+        for cache, key, value, ttl in self._local:
+            if value is None:
+                cache.delete(key)
+            else:
+                cache.set(key, value, ttl=ttl)
+
+    def __bool__(self) -> bool:
+        return bool(self._unlink or self._redirects or self._messages or self._writers)
+
+    async def execute(self):
+        """Выполняет накопленное одним pipeline асинхронного клиента"""
+        self._apply_local()
+        if not self:
+            return
+        pipe = async_redis_client.pipeline(transaction=False)
+        self._fill(pipe)
+        await pipe.execute()
+
+    def execute_sync(self):
+        """То же для фоновых задач с синхронным клиентом"""
+        self._apply_local()
+        if not self:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        self._fill(pipe)
+        pipe.execute()
+
+
+async def invalidate_links(
+        links: list[tuple[str, str | None]],
+        owner_id: int | None,
+        removed: bool = False,
+        writer: str | None = None):
+    """Сбрасывает кэши пачки ссылок владельца (short_code, url_hash) одним pipeline"""
+    invalidation = CacheInvalidation()
+    for short_code, hashed in links:
+        invalidation.link(short_code, owner_id, removed=removed, url_hashes=[hashed])
+    if writer:
+        invalidation.wrote(writer)
+    await invalidation.execute()
+
+
+async def invalidate_user(email: str):
+    """Удаляет пользователя из кэшей всех воркеров"""
+    invalidation = CacheInvalidation()
+    invalidation.user(email)
+    await invalidation.execute()
+
+
+async def read_for_cache(sessions, cache_key: str, read: Callable[..., Awaitable]):
+    """
+    Чтение из БД для заполнения общего кэша cache_key: read(db) в реплике,
+    если ключ не сбрасывали последние DB_READ_YOUR_WRITES_SECONDS (метка
+    recent_write:{cache_key}), иначе в основной БД. Если метка появилась,
+    пока шло чтение, результат перечитывается из основной БД
+    """
+    marker = f"{RECENT_WRITE_PREFIX}{cache_key}"
+    on_primary = not replicas.engines
+
+    async def recently_written() -> bool:
+        nonlocal on_primary
+        on_primary = bool(await async_redis_client.exists(marker))
+        return on_primary
+
+    async with sessions(prefer_primary=recently_written) as db:
+        result = await read(db)
+    if not on_primary and await recently_written():
+        async with sessions(primary=True) as db:
+            result = await read(db)
+    return result
@@ -0,0 +1,185 @@
+"""
+Пулы соединений БД и Redis со сбором метрик:
+сколько соединений выдано, сколько ждали свободного соединения и сколько раз не дождались
+"""
+
+import asyncio
+import queue
+import time
+import redis
+import redis.asyncio
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """Счётчики ожидания соединения из пула"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connection_errors = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.in_use = 0
+        self.in_use_peak = 0
+
+    def observe_wait(self, waited: float):
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        if waited > self.wait_seconds_max:
+            self.wait_seconds_max = waited
+
+    def acquired(self):
+        self.in_use += 1
+        if self.in_use > self.in_use_peak:
+            self.in_use_peak = self.in_use
+
+    def released(self):
+        self.in_use -= 1
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connection_errors": self.connection_errors,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+class _TimedPoolMixin:
+    """Замеряет время получения соединения из пула SQLAlchemy"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.observe_wait(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def db_pool_stats(pool) -> dict:
+    """Снимок состояния пула SQLAlchemy"""
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    if metrics := getattr(pool, "metrics", None):
+        stats.update(metrics.as_dict())
+    return stats
+
+
+# Redis не смог выдать соединение: пул исчерпан или соединение не установилось
+REDIS_GET_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+
+def is_pool_exhausted(error: Exception) -> bool:
+    """
+    BlockingConnectionPool сообщает об исчерпании тем же ConnectionError, что и
+    об ошибке соединения, но поднимает его из queue.Empty (sync) или
+    asyncio.TimeoutError (asyncio) при ожидании свободного соединения
+    """
+    return (
+        isinstance(error, redis.exceptions.ConnectionError)
+        and isinstance(error.__context__, (queue.Empty, asyncio.TimeoutError))
+        and str(error) == "No connection available."
+    )
+
+
+def count_redis_get_error(metrics: PoolMetrics, error: Exception):
+    """
+    Исчерпание пула считается как timeouts, остальное - как connection_errors.
+    Соединение, которое не удалось подключить, пул уже вернул через release,
+    хотя оно не было учтено в in_use
+    """
+    if is_pool_exhausted(error):
+        metrics.timeouts += 1
+    else:
+        metrics.connection_errors += 1
+        metrics.in_use += 1
+
+
+class TimedRedisPool(redis.BlockingConnectionPool):
+    """Блокирующий пул Redis: при исчерпании ждёт до timeout секунд и считает ожидания"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except REDIS_GET_ERRORS as e:
+            count_redis_get_error(self.metrics, e)
+            raise
+        finally:
+            self.metrics.observe_wait(time.perf_counter() - started)
+        self.metrics.acquired()
+        return connection
+
+    def release(self, connection):
+        self.metrics.released()
+        super().release(connection)
+
+
+class TimedAsyncRedisPool(redis.asyncio.BlockingConnectionPool):
+    """Асинхронный аналог TimedRedisPool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    async def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except REDIS_GET_ERRORS as e:
+            count_redis_get_error(self.metrics, e)
+            raise
+        finally:
+            self.metrics.observe_wait(time.perf_counter() - started)
+        self.metrics.acquired()
+        return connection
+
+    async def release(self, connection):
+        self.metrics.released()
+        await super().release(connection)
+
+
+def redis_pool_stats(pool) -> dict:
+    """Снимок состояния пула Redis"""
+    metrics = pool.metrics
+    # Пулы sync и asyncio хранят созданные соединения по-разному
+    if hasattr(pool, "_connections"):
+        created = len(pool._connections)
+    else:
+        created = len(pool._available_connections) + len(pool._in_use_connections)
+    return {
+        "max_connections": pool.max_connections,
+        "created": created,
+        "checked_out": metrics.in_use,
+        "checked_out_peak": metrics.in_use_peak,
+        "idle": max(created - metrics.in_use, 0),
+        **metrics.as_dict(),
+    }
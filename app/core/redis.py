@@ -2,15 +2,256 @@
 Конфигурация Redis
 """
 
+import asyncio
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable
 import redis
+import redis.asyncio
 from app.core.config import settings
+from app.core.local_cache import LocalCache
+from app.core.bloom import short_code_index
+from app.core.logger import logger
+from app.core.pool_metrics import TimedRedisPool, TimedAsyncRedisPool
+from app.core.metrics import cache_lookups
 
-redis_client = redis.Redis.from_url(settings.REDIS_URL)
+# Синхронный клиент для фоновых задач и подписки на инвалидации
+redis_pool = TimedRedisPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+)
+redis_client = redis.Redis(connection_pool=redis_pool)
 
-def cache_redirect(short_code: str, original_url: str):
-    """Кэширование ссылки на 1 час"""
-    redis_client.setex(f"redirect:{short_code}", 3600, original_url)
+# Асинхронный клиент с общим пулом соединений для обработчиков запросов
+async_redis_pool = TimedAsyncRedisPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+)
+async_redis_client = redis.asyncio.Redis(connection_pool=async_redis_pool)
 
-def get_cached_url(short_code: str) -> str | None:
-    """Получение URL из кэша"""
-    return redis_client.get(f"redirect:{short_code}")
\ No newline at end of file
+INVALIDATION_CHANNEL = "cache:invalidate"
+# События индекса коротких кодов: "+code" при создании, "-code" при удалении
+SHORT_CODES_CHANNEL = "shortcodes:events"
+
+# L1-кэш редиректов в памяти процесса, ключ - short_code
+redirect_cache = LocalCache(
+    max_entries=settings.L1_CACHE_MAX_ENTRIES,
+    max_bytes=settings.L1_CACHE_MAX_BYTES,
+    ttl=settings.L1_CACHE_TTL_SECONDS,
+)
+
+# Проверенные токены: sha256 токена -> email, живут не дольше exp токена
+token_cache = LocalCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    max_bytes=settings.AUTH_CACHE_MAX_BYTES,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+)
+
+# Пользователи по email, сбрасываются при изменении пользователя (см. app/core/invalidation.py)
+user_cache = LocalCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    max_bytes=settings.AUTH_CACHE_MAX_BYTES,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+# Префикс ключа Redis -> L1-кэш, который нужно чистить при его инвалидации
+local_caches = {"redirect": redirect_cache, "token": token_cache, "user": user_cache}
+
+# Маркер отсутствующей или истёкшей ссылки в кэше редиректов
+REDIRECT_NOT_FOUND = b"!404"
+
+def redirect_ttl(expires_at: datetime | None) -> int:
+    """TTL кэша редиректа: не дольше REDIRECT_CACHE_TTL_SECONDS и оставшегося срока жизни ссылки"""
+    if expires_at is None:
+        return settings.REDIRECT_CACHE_TTL_SECONDS
+    remaining = int((expires_at - datetime.utcnow()).total_seconds())
+    return min(settings.REDIRECT_CACHE_TTL_SECONDS, remaining)
+
+async def cache_redirect(short_code: str, original_url: str, expires_at: datetime | None = None):
+    """
+    Кэширование ссылки до истечения её срока жизни.
+    Новые и изменённые ссылки записываются через CacheInvalidation (app/core/invalidation.py)
+    """
+    ttl = redirect_ttl(expires_at)
+    if ttl <= 0:
+        return
+    await async_redis_client.setex(f"redirect:{short_code}", ttl, original_url)
+    redirect_cache.set(short_code, original_url.encode(), ttl=ttl)
+
+async def cache_missing_redirect(short_code: str):
+    """
+    Кэширует 404 для неизвестного или истёкшего кода на REDIRECT_NEGATIVE_TTL_SECONDS.
+    Только если ключа нет (SET NX): ссылку могли создать и записать в кэш,
+    пока шло чтение из БД, и маркер не должен её перетереть
+    """
+    ttl = settings.REDIRECT_NEGATIVE_TTL_SECONDS
+    if await async_redis_client.set(f"redirect:{short_code}", REDIRECT_NOT_FOUND, ex=ttl, nx=True):
+        redirect_cache.set(short_code, REDIRECT_NOT_FOUND, ttl=ttl)
+
+# user_links_version:{owner_id} растёт при каждом сбросе списка ссылок владельца
+USER_LINKS_VERSION_PREFIX = "user_links_version:"
+
+# Пишет страницу в user_links:{owner_id}, только если версия списка не изменилась
+# с начала чтения из БД: иначе страница могла устареть до записи
+_SET_USER_LINKS_PAGE = """
+if (redis.call("get", KEYS[2]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("hset", KEYS[1], ARGV[2], ARGV[3])
+redis.call("expire", KEYS[1], ARGV[4], "NX")
+return 1
+"""
+
+async def get_user_links_page(owner_id: int, page_key: str) -> tuple[bytes | None, bytes]:
+    """Страница списка ссылок из кэша и текущая версия списка одним pipeline"""
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.hget(f"user_links:{owner_id}", page_key)
+    pipe.get(f"{USER_LINKS_VERSION_PREFIX}{owner_id}")
+    page, version = await pipe.execute()
+    return page, version or b""
+
+async def cache_user_links_page(owner_id: int, page_key: str, page: str, version: bytes):
+    """Кэширует страницу, прочитанную при версии списка version"""
+    await async_redis_client.eval(
+        _SET_USER_LINKS_PAGE, 2, f"user_links:{owner_id}", f"{USER_LINKS_VERSION_PREFIX}{owner_id}",
+        version, page_key, page, settings.USER_LINKS_CACHE_TTL_SECONDS,
+    )
+
+async def get_with_ttl(key: str) -> tuple[bytes | None, int]:
+    """Значение ключа и оставшийся TTL в мс одним pipeline"""
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.get(key)
+    pipe.pttl(key)
+    value, pttl = await pipe.execute()
+    return value, pttl
+
+async def get_cached_url(short_code: str) -> tuple[bytes | None, bool]:
+    """
+    Получение URL из кэша: сначала из памяти процесса, затем из Redis.
+    Для известных отсутствующих ссылок возвращает REDIRECT_NOT_FOUND.
+    Второй элемент - пора ли обновить запись заранее (см. should_refresh_early)
+    """
+    if cached_url := redirect_cache.get(short_code):
+        cache_lookups.inc("redirect", "l1_hit")
+        return cached_url, False
+    cached_url, pttl = await get_with_ttl(f"redirect:{short_code}")
+    cache_lookups.inc("redirect", "hit" if cached_url else "miss")
+    if cached_url and pttl > 0:
+        # L1 не должен пережить запись в Redis, иначе отдаст истёкшую ссылку
+        redirect_cache.set(short_code, cached_url, ttl=pttl / 1000)
+    return cached_url, cached_url is not None and should_refresh_early("redirect", pttl)
+
+# Защита от лавины промахов: пересборку записи выполняет один вызывающий.
+# В процессе остальные ждут его результата (single-flight), между процессами
+# держится короткая блокировка lock:{key}, а записи обновляются заранее по XFetch
+
+# Ключ -> задача пересборки, которую ждут все запросы процесса
+_inflight: dict[str, asyncio.Task] = {}
+
+# Префикс ключа -> сглаженное время пересборки в секундах (delta в XFetch)
+rebuild_seconds: dict[str, float] = {}
+
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def should_refresh_early(prefix: str, pttl: int) -> bool:
+    """
+    XFetch: обновить запись до истечения с вероятностью, растущей к концу TTL
+    и пропорциональной времени её пересборки
+    """
+    if pttl < 0:
+        return False
+    delta = rebuild_seconds.get(prefix, 0.0)
+    # 1 - random() лежит в (0, 1], логарифм определён
+    return -delta * settings.CACHE_XFETCH_BETA * math.log(1 - random.random()) >= pttl / 1000
+
+def _observe_rebuild(prefix: str, seconds: float):
+    previous = rebuild_seconds.get(prefix)
+    rebuild_seconds[prefix] = seconds if previous is None else previous * 0.9 + seconds * 0.1
+
+async def _rebuild_locked(key, rebuild, read_cache, stale):
+    lock_key = f"lock:{key}"
+    token = uuid.uuid4().hex
+    if await async_redis_client.set(lock_key, token, nx=True, px=settings.CACHE_REBUILD_LOCK_MS):
+        started = time.perf_counter()
+        try:
+            return await rebuild()
+        finally:
+            _observe_rebuild(key.partition(":")[0], time.perf_counter() - started)
+            await async_redis_client.eval(_RELEASE_LOCK, 1, lock_key, token)
+
+    # Запись пересобирает другой процесс: отдаём старое значение или ждём новое
+    if stale is not None:
+        return stale
+    deadline = time.monotonic() + settings.CACHE_REBUILD_LOCK_MS / 1000
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.CACHE_REBUILD_POLL_MS / 1000)
+        if (value := await read_cache()) is not None:
+            return value
+    # Владелец блокировки не успел, строим сами
+    return await rebuild()
+
+async def rebuild_once(
+        key: str,
+        rebuild: Callable[[], Awaitable],
+        read_cache: Callable[[], Awaitable],
+        stale=None):
+    """
+    Пересобирает запись кэша key не более чем одним вызывающим.
+    rebuild строит и сохраняет запись, read_cache читает её из Redis (None - записи нет).
+    stale - текущее значение при раннем обновлении: его получают все, кто не взял блокировку
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_rebuild_locked(key, rebuild, read_cache, stale))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    elif stale is not None:
+        return stale
+    # shield: отмена одного запроса не должна отменять пересборку для остальных
+    return await asyncio.shield(task)
+
+def _drop_local(key: str):
+    prefix, _, name = key.partition(":")
+    if cache := local_caches.get(prefix):
+        cache.delete(name)
+
+def _apply_short_code_event(event: str):
+    if event.startswith("+"):
+        short_code_index.add(event[1:])
+    elif event.startswith("-"):
+        short_code_index.remove(event[1:])
+
+def _listen_invalidations():
+    handlers = {
+        INVALIDATION_CHANNEL.encode(): _drop_local,
+        SHORT_CODES_CHANNEL.encode(): _apply_short_code_event,
+    }
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(*handlers)
+            # Пока подписки не было, сообщения могли потеряться:
+            # чистим L1 и помечаем индекс кодов для перестроения
+            for cache in local_caches.values():
+                cache.clear()
+            short_code_index.invalidate()
+            for message in pubsub.listen():
+                handlers[message["channel"]](message["data"].decode())
+        except Exception as e:
+            logger.error(f"Cache invalidation listener failed: {e}")
+            time.sleep(1)
+
+def start_invalidation_listener():
+    """Запускает фоновую подписку на инвалидации L1-кэшей"""
+    threading.Thread(target=_listen_invalidations, name="cache-invalidation", daemon=True).start()
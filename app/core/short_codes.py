@@ -0,0 +1,267 @@
+"""
+Стратегии генерации коротких кодов.
+sequence и snowflake выдают уникальные коды без проверки в БД,
+random оставлен для совместимости и может давать коллизии
+"""
+
+import asyncio
+import hashlib
+import random
+import string
+import time
+import uuid
+from app.core.config import settings
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+SEQUENCE_KEY = "shortcode:sequence"
+# Номер последовательности переставляется ключевой сетью Фейстеля, чтобы соседние
+# ссылки не получали соседние коды и пространство кодов нельзя было обойти подряд
+SEQUENCE_MIN_LENGTH = 6
+FEISTEL_ROUNDS = 4
+WORKER_ID_KEY = "shortcode:worker_id"
+# shortcode:worker:{id} - арендованный номер воркера, значение - токен владельца
+WORKER_SLOT_PREFIX = "shortcode:worker:"
+
+# Snowflake: 41 бит времени в мс, 10 бит воркера, 12 бит счётчика в пределах мс
+SNOWFLAKE_EPOCH_MS = 1735689600000  # 2025-01-01
+WORKER_ID_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_ID_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+def generate_short_code(length: int = 6) -> str:
+    """Генерация случайного кода для короткой ссылки"""
+    chars = string.ascii_letters + string.digits
+    return ''.join(random.choice(chars) for _ in range(length))
+
+
+def encode_base62(number: int) -> str:
+    """Кодирует неотрицательное число в base62"""
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return ''.join(reversed(digits))
+
+
+def sequence_key(secret: str | None = None) -> bytes:
+    """Ключ перестановки: SHORT_CODE_SECRET или, если он не задан, SECRET_KEY"""
+    secret = secret or settings.SHORT_CODE_SECRET or settings.SECRET_KEY
+    return hashlib.blake2b(secret.encode(), digest_size=32, person=b"shortcode").digest()
+
+
+def permute_sequence(number: int, key: bytes) -> str:
+    """
+    Код для номера последовательности. Номер переставляется внутри [0, 62**k)
+    для наименьшего чётного k >= 6, где он помещается: сеть Фейстеля на двух
+    половинах по k/2 цифр base62. Код дополняется нулями до k символов, поэтому
+    коды разной длины не пересекаются
+    """
+    length = SEQUENCE_MIN_LENGTH
+    while number >= 62 ** length:
+        length += 2
+    half = 62 ** (length // 2)
+    left, right = divmod(number, half)
+    for round_number in range(FEISTEL_ROUNDS):
+        digest = hashlib.blake2b(f"{round_number}:{right}".encode(), key=key, digest_size=8).digest()
+        left, right = right, (left + int.from_bytes(digest, "big")) % half
+    return encode_base62(left * half + right).rjust(length, BASE62_ALPHABET[0])
+
+
+_EXTEND_LEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisLeaseStore:
+    """Счётчики и аренда номеров в Redis, общие для всех воркеров"""
+
+    def __init__(self, client=None, prefix: str = ""):
+        self._client = client
+        self.prefix = prefix
+
+    @property
+    def client(self):
+        if self._client is None:
+            from app.core.redis import async_redis_client
+            self._client = async_redis_client
+        return self._client
+
+    async def incrby(self, key: str, amount: int) -> int:
+        return await self.client.incrby(self.prefix + key, amount)
+
+    async def claim(self, key: str, token: str, ttl: int) -> bool:
+        return bool(await self.client.set(self.prefix + key, token, nx=True, ex=ttl))
+
+    async def extend(self, key: str, token: str, ttl: int) -> bool:
+        """Продлевает аренду, только если она всё ещё наша"""
+        return bool(await self.client.eval(_EXTEND_LEASE, 1, self.prefix + key, token, ttl))
+
+
+class LocalLeaseStore:
+    """То же в памяти процесса: для запуска в одном процессе, тестов и бенчмарков"""
+
+    def __init__(self):
+        self._counters: dict[str, int] = {}
+        self._claims: dict[str, tuple[str, float]] = {}
+
+    async def incrby(self, key: str, amount: int) -> int:
+        self._counters[key] = self._counters.get(key, 0) + amount
+        return self._counters[key]
+
+    async def claim(self, key: str, token: str, ttl: int) -> bool:
+        owner = self._claims.get(key)
+        if owner and owner[1] > time.monotonic():
+            return False
+        self._claims[key] = (token, time.monotonic() + ttl)
+        return True
+
+    async def extend(self, key: str, token: str, ttl: int) -> bool:
+        owner = self._claims.get(key)
+        if not owner or owner[0] != token or owner[1] <= time.monotonic():
+            return False
+        self._claims[key] = (token, time.monotonic() + ttl)
+        return True
+
+
+class RandomCodeGenerator:
+    """Случайный код фиксированной длины. Уникальность не гарантируется"""
+
+    name = "random"
+
+    def __init__(self, length: int = 6):
+        self.length = length
+
+    async def generate(self) -> str:
+        return generate_short_code(self.length)
+
+
+class SequenceCodeGenerator:
+    """
+    Коды из глобального счётчика. Воркер арендует в Redis блок из block_size
+    номеров одним INCRBY и раздаёт их локально, так что Redis трогается
+    раз в block_size созданий. Номер проходит через permute_sequence, поэтому
+    по одному коду нельзя получить соседние
+    """
+
+    name = "sequence"
+
+    def __init__(
+            self,
+            block_size: int,
+            store: RedisLeaseStore | LocalLeaseStore | None = None,
+            secret: str | None = None):
+        self.block_size = block_size
+        self._store = store or RedisLeaseStore()
+        self._key = sequence_key(secret)
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def generate(self) -> str:
+        async with self._lock:
+            if self._next >= self._end:
+                self._end = await self._store.incrby(SEQUENCE_KEY, self.block_size)
+                self._next = self._end - self.block_size
+            number = self._next
+            self._next += 1
+        return permute_sequence(number, self._key)
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class SnowflakeCodeGenerator:
+    """
+    base62 от Snowflake-идентификатора (время, номер воркера, счётчик).
+    Номер воркера берётся из настроек или арендуется в Redis на ttl секунд
+    (SET NX shortcode:worker:{id}). Аренда продлевается при генерации не реже
+    чем раз в ttl/3; если она потеряна, воркер берёт другой свободный номер.
+    Когда свободных номеров нет, генерация падает, а не повторяет чужой номер
+    """
+
+    name = "snowflake"
+
+    def __init__(
+            self,
+            worker_id: int | None = None,
+            store: RedisLeaseStore | LocalLeaseStore | None = None,
+            ttl: int = settings.SHORT_CODE_WORKER_ID_TTL_SECONDS):
+        self.worker_id = worker_id
+        self._leased = worker_id is None
+        self._store = store or RedisLeaseStore()
+        self.ttl = ttl
+        self._token = uuid.uuid4().hex
+        self._confirmed_until = 0.0
+        self._lock = asyncio.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    async def _acquire_worker_id(self) -> int:
+        start = await self._store.incrby(WORKER_ID_KEY, 1)
+        for offset in range(MAX_WORKER_ID + 1):
+            worker_id = (start + offset) & MAX_WORKER_ID
+            if await self._store.claim(f"{WORKER_SLOT_PREFIX}{worker_id}", self._token, self.ttl):
+                return worker_id
+        raise RuntimeError("All snowflake worker ids are leased")
+
+    async def _ensure_worker_id(self):
+        if time.monotonic() < self._confirmed_until:
+            return
+        async with self._lock:
+            if time.monotonic() < self._confirmed_until:
+                return
+            key = f"{WORKER_SLOT_PREFIX}{self.worker_id}"
+            if self.worker_id is None or not await self._store.extend(key, self._token, self.ttl):
+                self.worker_id = await self._acquire_worker_id()
+            self._confirmed_until = time.monotonic() + self.ttl / 3
+
+    def _next_id(self, now_ms: int) -> int:
+        if now_ms == self._last_ms:
+            self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+            if self._sequence == 0:
+                # Счётчик миллисекунды исчерпан: ждём следующую, это меньше 1 мс
+                while now_ms <= self._last_ms:
+                    now_ms = _now_ms()
+        else:
+            self._sequence = 0
+        self._last_ms = now_ms
+
+        return (
+            ((now_ms - SNOWFLAKE_EPOCH_MS) << (WORKER_ID_BITS + SEQUENCE_BITS))
+            | (self.worker_id << SEQUENCE_BITS)
+            | self._sequence
+        )
+
+    async def generate(self) -> str:
+        if self._leased:
+            await self._ensure_worker_id()
+        # Часы могли уйти назад: ждём, не блокируя цикл событий, пока не догонят
+        now_ms = _now_ms()
+        while now_ms < self._last_ms:
+            await asyncio.sleep((self._last_ms - now_ms) / 1000)
+            now_ms = _now_ms()
+        # От чтения часов до выдачи id нет await, поэтому счётчик не нужно защищать
+        return encode_base62(self._next_id(now_ms))
+
+
+def create_short_code_generator(strategy: str = settings.SHORT_CODE_STRATEGY):
+    """Создаёт генератор по названию стратегии из настроек"""
+    if strategy == "sequence":
+        return SequenceCodeGenerator(settings.SHORT_CODE_BLOCK_SIZE)
+    if strategy == "snowflake":
+        return SnowflakeCodeGenerator(settings.SHORT_CODE_WORKER_ID)
+    if strategy == "random":
+        return RandomCodeGenerator()
+    raise ValueError(f"Unknown short code strategy: {strategy}")
+
+
+short_code_generator = create_short_code_generator()
@@ -1,35 +1,204 @@
 """
 Конфигурацмя шедулера для регулярного удаления устаревших ссылок
+и переноса накопленных переходов в БД.
+Общие для кластера задачи защищены арендой в Redis и выполняются одним
+процессом за интервал: в API (RUN_CLUSTER_JOBS_IN_API) или в отдельном worker.py
 """
 
+import socket
+import uuid
+from datetime import datetime
+from functools import wraps
 from apscheduler.schedulers.background import BackgroundScheduler
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import SessionLocal
 from app.crud import crud_link
-from datetime import datetime
+import time
+from itertools import islice
 from app.core.logger import logger
+from app.core.clicks import click_buffer, push_pending_clicks, take_pending_clicks
+from app.core.click_analytics import click_events, push_click_events
+from app.core.redis import redis_client
+from app.core.invalidation import CacheInvalidation
+from app.core.bloom import short_code_index
+from app.core.config import settings
+from app.core.metrics import track_job
 
-scheduler = BackgroundScheduler()
+def invalidate_deleted_links(links: list):
+    """Чистит кэши удалённых ссылок одним pipeline"""
+    invalidation = CacheInvalidation()
+    for short_code, owner_id, hashed in links:
+        invalidation.link(short_code, owner_id, removed=True, url_hashes=[hashed])
+    invalidation.execute_sync()
 
 def delete_expired_links():
-    """Удаляет ссылки с истёкшим сроком действия."""
-    db: Session = next(get_db())
+    """
+    Удаляет ссылки с истёкшим сроком действия пачками по PURGE_BATCH_SIZE,
+    пока они не кончатся или не выйдет PURGE_TIME_BUDGET_SECONDS.
+    """
+    started = time.monotonic()
+    deleted = 0
+    # Задачи открывают обычную сессию: get_db для запросов и пишет метрику
+    # db_checkouts_per_request
+    with SessionLocal() as db:
+        try:
+            while time.monotonic() - started < settings.PURGE_TIME_BUDGET_SECONDS:
+                links = crud_link.delete_expired_links(db, settings.PURGE_BATCH_SIZE)
+                if links:
+                    deleted += len(links)
+                    invalidate_deleted_links(links)
+                if len(links) < settings.PURGE_BATCH_SIZE:
+                    break
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to delete expired links: {e}")
+
+    logger.info(f"Deleted {deleted} expired links in {time.monotonic() - started:.2f}s")
+    return deleted
+
+def flush_clicks():
+    """Переносит переходы и свёрнутые события из буферов процесса в Redis."""
+    pending = click_buffer.drain()
+    if pending:
+        try:
+            push_pending_clicks(pending)
+        except Exception as e:
+            click_buffer.restore(pending)
+            logger.error(f"Failed to flush clicks to Redis: {e}")
+
+    if click_buffer.dropped:
+        logger.warning(f"Click buffer overflow, dropped {click_buffer.dropped} clicks")
+        click_buffer.dropped = 0
+
+    events = click_events.drain()
+    if events:
+        try:
+            push_click_events(events)
+        except Exception as e:
+            click_events.restore(events)
+            logger.error(f"Failed to flush click events to Redis: {e}")
+
+    if click_events.dropped:
+        logger.warning(f"Click event buffer overflow, dropped {click_events.dropped} events")
+        click_events.dropped = 0
+
+def reconcile_clicks():
+    """Записывает накопленные в Redis переходы в БД пачками по CLICK_FLUSH_BATCH_SIZE."""
     try:
-        expired_links = crud_link.delete_expired_links(db)
-        
-        if expired_links:
-            deleted_links_info = [
-                f"ID: {link.id}, Short Code: {link.short_code}, Original URL: {link.original_url}, Expires At: {link.expires_at}"
-                for link in expired_links
-            ]
-            logger.info(f"Deleted {len(expired_links)} expired links:\n" + "\n".join(deleted_links_info))
-        else:
-            logger.info("No expired links found.")
+        pending, draining_keys = take_pending_clicks()
     except Exception as e:
-        logger.error(f"Failed to delete expired links: {e}")
-    finally:
-        db.close()
+        logger.error(f"Failed to take pending clicks: {e}")
+        return 0
+    if not pending:
+        return 0
 
-scheduler.add_job(delete_expired_links, 'interval', minutes=1)
+    items = iter(pending.items())
+    updated = []
+    with SessionLocal() as db:
+        try:
+            while batch := dict(islice(items, settings.CLICK_FLUSH_BATCH_SIZE)):
+                try:
+                    updated += crud_link.apply_click_deltas(db, batch)
+                except Exception:
+                    db.rollback()
+                    # Не записанные пачки возвращаем в Redis до следующего запуска
+                    try:
+                        push_pending_clicks({**batch, **dict(items)})
+                    except Exception:
+                        # Оставляем временные ключи в Redis, чтобы переходы не потерялись
+                        draining_keys = []
+                    raise
+            logger.info(f"Reconciled clicks for {len(updated)} links")
+        except Exception as e:
+            logger.error(f"Failed to reconcile clicks: {e}")
 
-scheduler.start()
+    # Кэш статистики хранит снимок из БД, после записи он устарел
+    pipe = redis_client.pipeline(transaction=False)
+    for short_code, owner_id in updated:
+        if owner_id is not None:
+            pipe.unlink(f"stats:{short_code}:{owner_id}")
+    if draining_keys:
+        pipe.unlink(*draining_keys)
+    pipe.execute()
+    return len(updated)
+
+def refresh_short_code_index():
+    """
+    Перестраивает индекс коротких кодов, если он ещё не построен, сброшен
+    после переподключения к Redis или старше BLOOM_REBUILD_INTERVAL_SECONDS
+    """
+    if short_code_index.ready and time.monotonic() - short_code_index.built_at < settings.BLOOM_REBUILD_INTERVAL_SECONDS:
+        return
+    with SessionLocal() as db:
+        try:
+            short_code_index.rebuild(db)
+        except Exception as e:
+            logger.error(f"Failed to rebuild short code index: {e}")
+
+def cluster_job(name: str, interval_seconds: int):
+    """
+    Запускает задачу не чаще раза за interval_seconds на весь кластер.
+    Процесс, захвативший аренду (SET NX PX), не снимает её после выполнения,
+    поэтому тики остальных воркеров в этом интервале пропускаются.
+    Длительность и результат последнего запуска пишутся в jobs:last_run:<name>
+    """
+    lease_ms = max(interval_seconds - 1, 1) * 1000
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper():
+            try:
+                acquired = redis_client.set(f"lock:job:{name}", uuid.uuid4().hex, nx=True, px=lease_ms)
+            except Exception as e:
+                logger.error(f"Failed to acquire lease for job {name}: {e}")
+                return
+            if not acquired:
+                return
+
+            started_at = datetime.utcnow()
+            started = time.monotonic()
+            result = func()
+            duration = time.monotonic() - started
+            logger.info(f"Job {name} finished in {duration:.2f}s, result: {result}")
+            try:
+                redis_client.hset(f"jobs:last_run:{name}", mapping={
+                    "started_at": started_at.isoformat(),
+                    "duration_seconds": f"{duration:.3f}",
+                    "result": result,
+                    "host": socket.gethostname(),
+                })
+            except Exception as e:
+                logger.error(f"Failed to report job {name}: {e}")
+            return result
+        return wrapper
+    return decorator
+
+CLUSTER_JOBS = {
+    "delete_expired_links": (delete_expired_links, 60),
+    "reconcile_clicks": (reconcile_clicks, settings.CLICK_RECONCILE_INTERVAL_SECONDS),
+}
+
+def add_cluster_jobs(scheduler):
+    """Добавляет в шедулер общие для кластера задачи"""
+    for name, (func, interval_seconds) in CLUSTER_JOBS.items():
+        scheduler.add_job(
+            # Метрика только для запусков, взявших аренду: пропуски не считаются выполнением
+            cluster_job(name, interval_seconds)(track_job(name)(func)),
+            'interval',
+            seconds=interval_seconds,
+            id=name,
+            max_instances=1,
+            coalesce=True,
+        )
+
+# Шедулер процесса API, запускается на старте приложения (см. main.py)
+scheduler = BackgroundScheduler()
+scheduler.add_job(
+    track_job("flush_clicks")(flush_clicks), 'interval',
+    seconds=settings.CLICK_FLUSH_INTERVAL_SECONDS, id="flush_clicks"
+)
+scheduler.add_job(
+    track_job("refresh_short_code_index")(refresh_short_code_index), 'interval', seconds=10,
+    id="refresh_short_code_index", next_run_time=datetime.now(), max_instances=1
+)
+if settings.RUN_CLUSTER_JOBS_IN_API:
+    add_cluster_jobs(scheduler)
@@ -0,0 +1,38 @@
+"""
+Нормализация оригинальных URL и их хэш для индексированного поиска
+"""
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Приводит URL к канонической форме: схема и хост в нижнем регистре,
+    без порта по умолчанию и фрагмента, пустой путь заменяется на "/"
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def url_hash(url: str) -> str:
+    """SHA-256 канонической формы URL в hex, 64 символа"""
+    return hashlib.sha256(canonicalize_url(url).encode()).hexdigest()
@@ -0,0 +1,351 @@
+"""
+Асинхронные функции для взаимодействия с БД из обработчиков запросов.
+Синхронные аналоги в crud_link используются фоновыми задачами и скриптами
+"""
+
+from sqlalchemy import select, update, delete, case, or_, and_, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Link
+from app.schemas.link import LinkCreate
+from app.core.short_codes import short_code_generator
+from app.core.config import settings
+from app.core.urls import url_hash
+from app.core.logger import logger
+from datetime import datetime, timedelta
+
+# Сгенерированный код может совпасть с кастомным алиасом или старым случайным кодом
+MAX_CODE_ATTEMPTS = 3
+
+async def create_link(
+        db: AsyncSession,
+        link: LinkCreate,
+        owner_id: int | None = None) -> Link:
+    """
+    Создание новой короткой ссылки. При LINK_DEDUPLICATE_PER_OWNER запрос без алиаса
+    и срока жизни возвращает уже существующую бессрочную ссылку владельца на тот же URL
+    """
+    try:
+        original_url = str(link.original_url)
+        if (settings.LINK_DEDUPLICATE_PER_OWNER and owner_id is not None
+                and not link.custom_alias and not link.expires_in_minutes):
+            if existing := await get_owner_link_by_url(db, original_url, owner_id):
+                return existing
+
+        expires_at = None
+        if link.expires_in_minutes:
+            expires_at = datetime.utcnow() + timedelta(minutes=link.expires_in_minutes)
+
+        for attempt in range(MAX_CODE_ATTEMPTS):
+            short_code = link.custom_alias or await short_code_generator.generate()
+            db_link = Link(
+                original_url=original_url,
+                url_hash=url_hash(original_url),
+                short_code=short_code,
+                expires_at=expires_at,
+                owner_id=owner_id
+            )
+
+            db.add(db_link)
+            try:
+                await db.commit()
+                break
+            except IntegrityError:
+                await db.rollback()
+                if link.custom_alias or attempt == MAX_CODE_ATTEMPTS - 1:
+                    raise
+
+        logger.info(
+                f"Link created: id={db_link.id}, short_code={db_link.short_code}, "
+                f"owner_id={db_link.owner_id}"
+            )
+        return db_link
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to create link: {e}")
+        raise
+
+
+# INSERT ... ON CONFLICT DO NOTHING есть только в диалектных конструкциях
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+async def create_links_bulk(
+        db: AsyncSession,
+        links: list[LinkCreate],
+        owner_id: int | None = None) -> list[dict]:
+    """
+    Пакетное создание ссылок одним многострочным INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    Занятые алиасы не валят всю пачку, а возвращаются как conflict.
+    Возвращает результат по каждой ссылке в порядке входного списка
+    """
+    now = datetime.utcnow()
+    results: list[dict | None] = [None] * len(links)
+    rows: dict[int, dict] = {}
+    aliases = set()
+
+    for index, link in enumerate(links):
+        if link.custom_alias in aliases:
+            results[index] = {
+                "status": "conflict",
+                "original_url": str(link.original_url),
+                "detail": "Alias already taken",
+            }
+            continue
+        if link.custom_alias:
+            aliases.add(link.custom_alias)
+        rows[index] = {
+            "original_url": str(link.original_url),
+            "url_hash": url_hash(str(link.original_url)),
+            "short_code": link.custom_alias,
+            "created_at": now,
+            "expires_at": (
+                now + timedelta(minutes=link.expires_in_minutes)
+                if link.expires_in_minutes else None
+            ),
+            "owner_id": owner_id,
+            "access_count": 0,
+        }
+
+    insert = DIALECT_INSERTS[db.get_bind().dialect.name]
+    # Коды, уже выданные в этой пачке: сгенерированный код не должен совпасть
+    # ни с алиасом, ни с другим кодом пачки
+    taken = set(aliases)
+    try:
+        for _ in range(MAX_CODE_ATTEMPTS):
+            if not rows:
+                break
+            for row in rows.values():
+                if row["short_code"] is None:
+                    while (short_code := await short_code_generator.generate()) in taken:
+                        pass
+                    taken.add(short_code)
+                    row["short_code"] = short_code
+                    row["generated"] = True
+
+            stmt = (
+                insert(Link)
+                .values([{k: v for k, v in row.items() if k != "generated"} for row in rows.values()])
+                .on_conflict_do_nothing(index_elements=["short_code"])
+                .returning(Link.short_code, Link.original_url)
+            )
+            inserted = set((await db.execute(stmt)).tuples())
+            await db.commit()
+
+            retry = {}
+            for index, row in rows.items():
+                if (row["short_code"], row["original_url"]) in inserted:
+                    results[index] = {"status": "created", **row}
+                elif not row.get("generated"):
+                    results[index] = {
+                        "status": "conflict",
+                        "original_url": row["original_url"],
+                        "detail": "Alias already taken",
+                    }
+                else:
+                    # Сгенерированный код занят старой ссылкой, пробуем следующий
+                    row["short_code"] = None
+                    retry[index] = row
+            rows = retry
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to create links batch: {e}")
+        raise
+
+    for index, row in rows.items():
+        results[index] = {
+            "status": "conflict",
+            "original_url": row["original_url"],
+            "detail": "Could not generate a free short code",
+        }
+    for result in results:
+        result.pop("generated", None)
+        result.pop("access_count", None)
+        result.pop("url_hash", None)
+
+    logger.info(
+        f"Links batch created: {sum(r['status'] == 'created' for r in results)} of {len(links)}, "
+        f"owner_id={owner_id}"
+    )
+    return results
+
+
+async def get_link_by_short_code(db: AsyncSession, short_code: str) -> Link | None:
+    """Получение действующей (не истёкшей) ссылки по короткому коду"""
+    result = await db.execute(
+        select(Link).where(
+            Link.short_code == short_code,
+            or_(Link.expires_at.is_(None), Link.expires_at > datetime.utcnow())
+        )
+    )
+    return result.scalars().first()
+
+async def get_user_link(db: AsyncSession, short_code: str, owner_id: int) -> Link | None:
+    """Получение ссылки по короткому коду, если пользователь является владельцем"""
+    result = await db.execute(
+        select(Link).where(
+            Link.short_code == short_code,
+            Link.owner_id == owner_id
+        )
+    )
+    return result.scalars().first()
+
+async def get_owner_links(
+        db: AsyncSession,
+        owner_id: int,
+        limit: int,
+        sort: str = "id",
+        after: tuple | None = None,
+        expired: bool | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None) -> list[Link]:
+    """
+    Страница ссылок владельца по убыванию id или access_count.
+    after - ключ последней ссылки предыдущей страницы: (id,) или (access_count, id).
+    Поиск идёт по индексу (owner_id, ...) без OFFSET
+    """
+    query = select(Link).where(Link.owner_id == owner_id)
+    if sort == "access_count":
+        if after:
+            query = query.where(tuple_(Link.access_count, Link.id) < tuple_(*after))
+        query = query.order_by(Link.access_count.desc(), Link.id.desc())
+    else:
+        if after:
+            query = query.where(Link.id < after[0])
+        query = query.order_by(Link.id.desc())
+
+    now = datetime.utcnow()
+    if expired is True:
+        query = query.where(and_(Link.expires_at.is_not(None), Link.expires_at <= now))
+    elif expired is False:
+        query = query.where(or_(Link.expires_at.is_(None), Link.expires_at > now))
+    if created_from:
+        query = query.where(Link.created_at >= created_from)
+    if created_to:
+        query = query.where(Link.created_at < created_to)
+
+    result = await db.execute(query.limit(limit))
+    return list(result.scalars())
+
+async def get_link_by_original_url(db: AsyncSession, original_url: str) -> Link | None:
+    """Поиск первой ссылки с указанным оригинальным URL по индексу url_hash"""
+    result = await db.execute(
+        select(Link).where(Link.url_hash == url_hash(original_url)).limit(1)
+    )
+    return result.scalars().first()
+
+async def get_owner_link_by_url(db: AsyncSession, original_url: str, owner_id: int) -> Link | None:
+    """Бессрочная ссылка владельца на тот же (с точностью до нормализации) URL"""
+    result = await db.execute(
+        select(Link).where(
+            Link.url_hash == url_hash(original_url),
+            Link.owner_id == owner_id,
+            Link.expires_at.is_(None)
+        ).limit(1)
+    )
+    return result.scalars().first()
+
+async def update_link(
+        db: AsyncSession,
+        short_code: str,
+        new_url: str,
+        owner_id: int) -> tuple[Link, str | None] | None:
+    """Обновляет оригинальный URL ссылки. Возвращает ссылку и её прежний url_hash"""
+    try:
+        link = await get_user_link(db, short_code, owner_id)
+        if not link:
+            return None
+
+        previous_hash = link.url_hash
+        link.original_url = new_url
+        link.url_hash = url_hash(new_url)
+        await db.commit()
+        return link, previous_hash
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to update link: {e}")
+        raise
+
+async def delete_link(db: AsyncSession, short_code: str, owner_id: int) -> Link | None:
+    """Удаляет ссылку, если пользователь является владельцем. Возвращает удалённую ссылку"""
+    try:
+        link = await get_user_link(db, short_code, owner_id)
+
+        if link:
+            await db.delete(link)
+            await db.commit()
+            logger.info(
+                f"Link deleted: id={link.id}, short_code={link.short_code}, "
+                f"owner_id={link.owner_id}"
+            )
+        return link
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to delete link: {e}")
+        raise
+
+async def delete_links_bulk(
+        db: AsyncSession,
+        owner_id: int,
+        short_codes: list[str] | None = None,
+        expired: bool | None = None) -> list:
+    """
+    Удаляет ссылки владельца одним DELETE ... RETURNING: по списку кодов
+    и/или только истёкшие. Возвращает (short_code, url_hash) удалённых ссылок
+    """
+    stmt = delete(Link).where(Link.owner_id == owner_id)
+    if short_codes is not None:
+        stmt = stmt.where(Link.short_code.in_(short_codes))
+    if expired:
+        stmt = stmt.where(Link.expires_at <= datetime.utcnow())
+    try:
+        result = await db.execute(
+            stmt.returning(Link.short_code, Link.url_hash).execution_options(synchronize_session=False)
+        )
+        deleted = result.all()
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to delete links batch: {e}")
+        raise
+    logger.info(f"Links batch deleted: {len(deleted)}, owner_id={owner_id}")
+    return deleted
+
+async def update_links_bulk(db: AsyncSession, owner_id: int, new_urls: dict[str, str]) -> list:
+    """
+    Меняет оригинальные URL ссылок владельца (short_code -> new_url) одним UPDATE ... RETURNING.
+    Прежние url_hash (для сброса кэша поиска) читаются перед ним в той же транзакции,
+    RETURNING отдаёт только новые значения. Возвращает (short_code, expires_at, прежний url_hash)
+    обновлённых ссылок
+    """
+    if not new_urls:
+        return []
+    owner_codes = and_(Link.owner_id == owner_id, Link.short_code.in_(list(new_urls)))
+    stmt = (
+        update(Link)
+        .where(owner_codes)
+        .values(
+            original_url=case(new_urls, value=Link.short_code),
+            url_hash=case({code: url_hash(url) for code, url in new_urls.items()}, value=Link.short_code),
+        )
+        .returning(Link.short_code, Link.expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        previous = dict((await db.execute(
+            select(Link.short_code, Link.url_hash).where(owner_codes).with_for_update()
+        )).all())
+        updated = [
+            (short_code, expires_at, previous.get(short_code))
+            for short_code, expires_at in (await db.execute(stmt)).all()
+        ]
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to update links batch: {e}")
+        raise
+    logger.info(f"Links batch updated: {len(updated)}, owner_id={owner_id}")
+    return updated
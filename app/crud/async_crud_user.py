@@ -0,0 +1,22 @@
+"""
+Асинхронные функции для авторизации пользователя и проверки его в БД
+"""
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import User
+from app.schemas.user import UserCreate
+
+async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user_data: UserCreate, hashed_password: str) -> User:
+    db_user = User(
+        email=user_data.email,
+        hashed_password=hashed_password,
+        is_active=True
+    )
+    db.add(db_user)
+    await db.commit()
+    return db_user
@@ -2,20 +2,16 @@
 Функции для взаимодействия с БД. Обновление данных по ссылкам
 """
 
+from sqlalchemy import update, delete, select, case, func, or_
 from sqlalchemy.orm import Session
 from app.db.models import Link
 from app.schemas.link import LinkCreate
-import random
-import string
+from app.core.short_codes import generate_short_code
+from app.core.urls import url_hash
 from app.core.logger import logger
 from typing import Optional
 from datetime import datetime, timedelta
 
-def generate_short_code(length: int = 6) -> str:
-    """Генерация случайного кода для короткой ссылки"""
-    chars = string.ascii_letters + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
-
 def create_link(
         db: Session, 
         link: LinkCreate, 
@@ -30,6 +26,7 @@ def create_link(
 
         db_link = Link(
             original_url=str(link.original_url),
+            url_hash=url_hash(str(link.original_url)),
             short_code=short_code,
             expires_at=expires_at,
             owner_id=owner_id
@@ -49,8 +46,11 @@ def create_link(
 
 
 def get_link_by_short_code(db: Session, short_code: str) -> Link | None:
-    """Получение ссылки по короткому коду"""
-    return db.query(Link).filter(Link.short_code == short_code).first()
+    """Получение действующей (не истёкшей) ссылки по короткому коду"""
+    return db.query(Link).filter(
+        Link.short_code == short_code,
+        or_(Link.expires_at.is_(None), Link.expires_at > datetime.utcnow())
+    ).first()
 
 def update_link(db: Session, short_code: str, new_url: str, owner_id: int) -> Link | None:
     """Обновляет оригинальный URL ссылки"""
@@ -62,6 +62,7 @@ def update_link(db: Session, short_code: str, new_url: str, owner_id: int) -> Li
         
         if link:
             link.original_url = new_url
+            link.url_hash = url_hash(new_url)
             db.commit()
             db.refresh(link)
         return link 
@@ -99,11 +100,55 @@ def update_link_stats(db: Session, link: Link) -> Link:
     db.refresh(link)
     return link
 
-def delete_expired_links(db: Session) -> int:
-    """Удаляет ссылки с истёкшим сроком действия."""
+def apply_click_deltas(db: Session, deltas: dict[str, tuple[int, datetime]]) -> list:
+    """
+    Пакетно применяет накопленные переходы одним UPDATE:
+    access_count = access_count + n, last_accessed = max(last_accessed, t).
+    Возвращает (short_code, owner_id) обновлённых ссылок
+    """
+    if not deltas:
+        return []
+
+    counts = case({code: count for code, (count, _) in deltas.items()}, value=Link.short_code)
+    accessed = case({code: accessed_at for code, (_, accessed_at) in deltas.items()}, value=Link.short_code)
+
+    stmt = (
+        update(Link)
+        .where(Link.short_code.in_(list(deltas)))
+        .values(
+            access_count=func.coalesce(Link.access_count, 0) + counts,
+            last_accessed=case(
+                (Link.last_accessed.is_(None), accessed),
+                (Link.last_accessed < accessed, accessed),
+                else_=Link.last_accessed,
+            ),
+        )
+        .returning(Link.short_code, Link.owner_id)
+        .execution_options(synchronize_session=False)
+    )
+    updated = db.execute(stmt).all()
+    db.commit()
+    return updated
+
+def delete_expired_links(db: Session, limit: int) -> list:
+    """
+    Удаляет не больше limit ссылок с истёкшим сроком действия одним DELETE.
+    Возвращает (short_code, owner_id, url_hash) удалённых ссылок
+    """
     now = datetime.utcnow()
-    expired_links = db.query(Link).filter(Link.expires_at < now).all()
-    for link in expired_links:
-        db.delete(link)
+    expired_ids = (
+        select(Link.id)
+        .where(Link.expires_at < now)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        delete(Link)
+        .where(Link.id.in_(expired_ids))
+        .returning(Link.short_code, Link.owner_id, Link.url_hash)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = db.execute(stmt).all()
     db.commit()
-    return expired_links
\ No newline at end of file
+    return deleted
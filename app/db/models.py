@@ -3,7 +3,7 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from .base import Base  
 
@@ -23,11 +23,19 @@ class Link(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     original_url = Column(String, nullable=False)
+    # SHA-256 канонического original_url (app/core/urls.py) для поиска по индексу
+    url_hash = Column(String(64), nullable=True, index=True)
     short_code = Column(String, unique=True, index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
     last_accessed = Column(DateTime, nullable=True)
     access_count = Column(Integer, default=0)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True) 
 
     owner = relationship("User", back_populates="links")
+
+    # Постраничный список ссылок владельца (keyset по id и по access_count)
+    __table_args__ = (
+        Index("ix_links_owner_id_id", "owner_id", "id"),
+        Index("ix_links_owner_id_access_count_id", "owner_id", "access_count", "id"),
+    )
@@ -1,13 +1,224 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.core.pool_metrics import TimedQueuePool, TimedAsyncQueuePool
+from app.core.metrics import instrument_engine, db_checkouts_per_request
 
-engine = create_engine(settings.DATABASE_URL)
+# Асинхронные драйверы для синхронных схем из DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(url: str) -> URL:
+    """Подменяет драйвер в DATABASE_URL на асинхронный"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+)
+
+# Синхронный движок остаётся для Alembic, фоновых задач и скриптов
+engine = create_engine(settings.DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    poolclass=TimedAsyncQueuePool,
+    **POOL_OPTIONS
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+
+class ReplicaRouter:
+    """
+    Выбор реплики для чтения по кругу. Реплика, на которой запрос упал
+    из-за соединения, пропускается retry_seconds, затем снова получает запросы
+    """
+
+    def __init__(self, engines: list, retry_seconds: float):
+        self.engines = engines
+        self.sessionmakers = [
+            async_sessionmaker(replica, autoflush=False, expire_on_commit=False) for replica in engines
+        ]
+        self.retry_seconds = retry_seconds
+        self._down_until = [0.0] * len(engines)
+        self._failures = [0] * len(engines)
+        self._counter = itertools.count()
+
+    def pick(self) -> int | None:
+        """Номер следующей доступной реплики, None - читать из основной БД"""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            index = next(self._counter) % len(self.engines)
+            if self._down_until[index] <= now:
+                return index
+        return None
+
+    def mark_down(self, index: int):
+        self._failures[index] += 1
+        self._down_until[index] = time.monotonic() + self.retry_seconds
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": replica.url.render_as_string(hide_password=True),
+                "available": self._down_until[index] <= now,
+                "failures": self._failures[index],
+            }
+            for index, replica in enumerate(self.engines)
+        ]
+
+
+replica_engines = [
+    create_async_engine(get_async_database_url(url.strip()), poolclass=TimedAsyncQueuePool, **POOL_OPTIONS)
+    for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+]
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine.sync_engine, f"replica{index}")
+replicas = ReplicaRouter(replica_engines, settings.DB_REPLICA_RETRY_SECONDS)
+
+@event.listens_for(Session, "after_begin")
+def count_checkout(session, transaction, connection):
+    """Транзакция сессии берёт соединение из пула и возвращает его при commit/rollback"""
+    session.info["checkouts"] = session.info.get("checkouts", 0) + 1
+
+
+class LazySession:
+    """
+    Сессия запроса, которая создаётся при первом обращении к ней.
+    FastAPI кэширует зависимость в пределах запроса, поэтому эндпоинт и
+    get_current_user делят одну сессию, а запросы без обращения к БД
+    не создают её вовсе
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._session = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    @property
+    def checkouts(self) -> int:
+        """Сколько раз сессия брала соединение из пула"""
+        return self._session.info.get("checkouts", 0) if self._session is not None else 0
+
+
 def get_db():
-    db = SessionLocal()
+    db = LazySession(SessionLocal)
+    try:
+        yield db
+    finally:
+        if db._session is not None:
+            db._session.close()
+        db_checkouts_per_request.observe(db.checkouts, "sync")
+
+async def get_async_db():
+    db = LazySession(AsyncSessionLocal)
+    try:
+        yield db
+    finally:
+        if db._session is not None:
+            await db._session.close()
+        db_checkouts_per_request.observe(db.checkouts, "async")
+
+
+def is_disconnect(error: BaseException) -> bool:
+    """Ошибка означает потерю соединения с БД, а не ошибку самого запроса"""
+    if isinstance(error, exc.DBAPIError):
+        return error.connection_invalidated
+    return isinstance(error, (exc.DisconnectionError, OSError))
+
+
+class ReadSession(LazySession):
+    """
+    Ленивая сессия для чтения. База выбирается при первом запросе: основная, если
+    реплик нет, все недоступны, primary=True или prefer_primary() вернул True
+    (его проверка тоже откладывается до первого запроса и не стоит ничего запросам,
+    которые обошлись кэшем). Если соединение с репликой потеряно на первом
+    запросе, реплика исключается, а запрос один раз повторяется в основной БД.
+    После успешного запроса сессия остаётся на своей БД
+    """
+
+    QUERY_METHODS = {"execute", "scalar", "scalars", "get"}
+
+    def __init__(self, primary: bool = False, prefer_primary=None):
+        super().__init__(AsyncSessionLocal)
+        self.index = None
+        self._primary = primary
+        self._prefer_primary = prefer_primary
+        self._used = False
+
+    async def _open(self):
+        primary = self._primary or not replicas.engines
+        if not primary and self._prefer_primary is not None:
+            primary = await self._prefer_primary()
+        self.index = None if primary else replicas.pick()
+        factory = AsyncSessionLocal if self.index is None else replicas.sessionmakers[self.index]
+        self._session = factory()
+
+    def __getattr__(self, name):
+        if self._used or name not in self.QUERY_METHODS:
+            return super().__getattr__(name)
+
+        async def call(*args, **kwargs):
+            if self._session is None:
+                await self._open()
+            try:
+                result = await getattr(self._session, name)(*args, **kwargs)
+            except Exception as e:
+                if self.index is None or not is_disconnect(e):
+                    raise
+                replicas.mark_down(self.index)
+                try:
+                    await self._session.close()
+                except Exception:
+                    pass
+                self.index = None
+                self._session = AsyncSessionLocal()
+                result = await getattr(self._session, name)(*args, **kwargs)
+            self._used = True
+            return result
+
+        return call
+
+    @property
+    def label(self) -> str:
+        return "async" if self.index is None else f"replica{self.index}"
+
+
+@asynccontextmanager
+async def read_session(primary: bool = False, prefer_primary=None):
+    """
+    Сессия для чтения (см. ReadSession). prefer_primary - корутинная функция,
+    которая решает, нужно ли прочитать только что записанное из основной БД.
+    Реплика исключается только при потере соединения (см. is_disconnect)
+    """
+    db = ReadSession(primary, prefer_primary)
     try:
         yield db
+    except Exception as e:
+        if db.index is not None and is_disconnect(e):
+            replicas.mark_down(db.index)
+        raise
     finally:
-        db.close()
+        if db._session is not None:
+            await db._session.close()
+        db_checkouts_per_request.observe(db.checkouts, db.label)
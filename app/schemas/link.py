@@ -4,7 +4,10 @@
 
 from datetime import datetime
 from pydantic import BaseModel, HttpUrl, Field, validator
-from typing import Optional
+from typing import Dict, Optional, List
+
+# Алиасы, совпадающие с маршрутами роутера /links
+RESERVED_ALIASES = {"mine"}
 
 class LinkBase(BaseModel):
     original_url: HttpUrl 
@@ -22,6 +25,12 @@ class LinkCreate(LinkBase):
         description="Link lifetime in minutes"
     )
 
+    @validator('custom_alias')
+    def validate_custom_alias(cls, v):
+        if v is not None and v.lower() in RESERVED_ALIASES:
+            raise ValueError("Alias is reserved")
+        return v
+
     @validator('expires_in_minutes')
     def validate_expires_in_minutes(cls, v):
         if v is not None and v <= 0:
@@ -39,15 +48,64 @@ class LinkResponse(LinkBase):
         from_attributes = True  
 
 
+class LinkListItem(LinkResponse):
+    access_count: int = 0
+    last_accessed: Optional[datetime] = None
+
+class LinkPage(BaseModel):
+    items: List[LinkListItem]
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы, None на последней")
+
 class LinkUpdate(BaseModel):
     new_url: HttpUrl 
 
+class ClickBucket(BaseModel):
+    start: datetime
+    clicks: int
+    referrers: Dict[str, int]
+    user_agents: Dict[str, int]
+    countries: Dict[str, int]
+
 class LinkStats(BaseModel):
     short_code: str
     original_url: str
     access_count: int
     expires_at: datetime | None
     last_accessed: datetime | None
+    timeseries: Optional[List[ClickBucket]] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class LinkBulkDelete(BaseModel):
+    short_codes: Optional[List[str]] = Field(None, min_length=1)
+    expired: bool = Field(False, description="Удалить только истёкшие ссылки")
+
+    @validator('expired', always=True)
+    def validate_filter(cls, v, values):
+        if values.get('short_codes') is None and not v:
+            raise ValueError("Either short_codes or expired filter is required")
+        return v
+
+class LinkBulkUpdateItem(BaseModel):
+    short_code: str
+    new_url: HttpUrl
+
+class LinkBulkUpdate(BaseModel):
+    items: List[LinkBulkUpdateItem] = Field(..., min_length=1)
+
+class LinkBulkResult(BaseModel):
+    affected: List[str]
+    not_found: List[str] = []
+
+class LinkBatchCreate(BaseModel):
+    items: List[LinkCreate] = Field(..., min_length=1)
+
+class LinkBatchItemResult(BaseModel):
+    index: int
+    status: str = Field(..., description="created, conflict или invalid")
+    short_code: Optional[str] = None
+    original_url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    detail: Optional[str] = None
@@ -1,11 +1,15 @@
 from fastapi import FastAPI, Depends, status, HTTPException
 import uvicorn
-from app.api.endpoints import links, auth
-from app.core.redis import redis_client
+from app.api.endpoints import links, auth, monitoring
+from app.core.redis import redis_client, async_redis_client, start_invalidation_listener
+from app.db.session import async_engine, replica_engines
 from fastapi.openapi.utils import get_openapi
 from app.schemas.user import UserInDB
 from app.api.deps import get_current_user
-from app.core.tasks import scheduler
+from app.core.tasks import scheduler, flush_clicks
+from app.core.metrics import MetricsMiddleware
+from app.core.config import settings
+from app.api.redirect import RedirectMiddleware
 
 
 app = FastAPI()
@@ -35,10 +39,29 @@ def custom_openapi():
 app.openapi = custom_openapi
 app.include_router(links.router)
 app.include_router(auth.router)
+app.include_router(monitoring.router)
+app.include_router(monitoring.metrics_router)
+if settings.REDIRECT_FAST_PATH:
+    app.add_middleware(
+        RedirectMiddleware,
+        route=next(route for route in links.router.routes if route.endpoint is links.redirect_to_original),
+    )
+# Добавлен последним, поэтому внешний: меряет и быстрый путь редиректа
+app.add_middleware(MetricsMiddleware)
+
+@app.on_event("startup")
+def startup_event():
+    start_invalidation_listener()
+    scheduler.start()
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     scheduler.shutdown()
+    flush_clicks()
+    await async_redis_client.aclose()
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
 
 @app.get("/test-redis")
 def test_redis():
@@ -0,0 +1,55 @@
+"""
+Микробенчмарки горячих путей обработки запроса (pytest-benchmark).
+Redis подменяется fakeredis, БД - SQLite в памяти, поэтому запуск не требует сервисов
+(зависимости в requirements-dev.txt):
+    pytest tests/benchmarks --benchmark-autosave
+    pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=median:15%
+"""
+
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def run():
+    """Выполняет корутину в отдельном цикле событий: benchmark меряет синхронный вызов"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Асинхронный клиент fakeredis вместо app.core.redis.async_redis_client"""
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.core import redis as redis_module
+
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(redis_module, "async_redis_client", client)
+    return client
+
+
+@pytest.fixture
+def sqlite_sessions(run):
+    """Фабрика асинхронных сессий SQLite в памяти со схемой приложения"""
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.db.base import Base
+
+    # Одно соединение на все сессии, иначе у каждой своя пустая база в памяти
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create_schema():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    run(create_schema())
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    # Сигнатура как у read_session, реплик нет
+    def sessions(primary=False, prefer_primary=None):
+        return session_factory()
+
+    yield sessions
+    run(engine.dispose())
@@ -0,0 +1,69 @@
+from datetime import datetime
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.api.endpoints.links import load_redirect, serialize_link_stats
+from app.core.invalidation import CacheInvalidation
+from app.core.redis import get_cached_url, redirect_cache
+from app.core.urls import url_hash
+from app.db.models import Link
+
+URL = "https://Example.com:443/articles/2024/05/some-long-slug?utm_source=newsletter#top"
+
+
+def test_cache_keys(benchmark):
+    short_code, owner_id = "100000", 1
+
+    def build():
+        return (
+            f"redirect:{short_code}", f"stats:{short_code}:{owner_id}",
+            f"search:{url_hash(URL)}", f"user_links:{owner_id}",
+        )
+
+    assert benchmark(build)[2].startswith("search:")
+
+
+def test_serialize_link_stats(benchmark):
+    link = Link(
+        id=1, short_code="100000", original_url=URL, owner_id=1, access_count=42,
+        created_at=datetime(2024, 5, 1, 12, 0), last_accessed=datetime(2024, 5, 2, 8, 30),
+    )
+    assert '"access_count": 42' in benchmark(serialize_link_stats, link)
+
+
+def test_invalidation_pipeline(benchmark, run, recording_pipeline):
+    async def execute():
+        invalidation = CacheInvalidation()
+        invalidation.link("100000", owner_id=1)
+        invalidation.write_redirect("100000", URL, None)
+        await invalidation.execute()
+        recording_pipeline.commands.clear()
+
+    benchmark(lambda: run(execute()))
+
+
+def test_redirect_l1_hit(benchmark, run):
+    redirect_cache.set("100000", URL.encode())
+    assert benchmark(lambda: run(get_cached_url("100000")))[0] == URL.encode()
+    redirect_cache.delete("100000")
+
+
+def test_redirect_redis_hit(benchmark, run, fake_redis):
+    run(fake_redis.setex("redirect:100000", 3600, URL))
+
+    def lookup():
+        redirect_cache.delete("100000")
+        return run(get_cached_url("100000"))
+
+    assert benchmark(lookup)[0] == URL.encode()
+
+
+def test_redirect_db_miss(benchmark, run, fake_redis, sqlite_sessions):
+    async def seed():
+        async with sqlite_sessions() as db:
+            db.add(Link(short_code="100000", original_url=URL, url_hash=url_hash(URL)))
+            await db.commit()
+
+    run(seed())
+    assert benchmark(lambda: run(load_redirect(sqlite_sessions, "100000"))) == URL.encode()
@@ -0,0 +1,29 @@
+from datetime import datetime
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.db.models import Link
+from app.schemas.link import LinkCreate, LinkResponse
+
+PAYLOAD = {
+    "original_url": "https://example.com/articles/2024/05/some-long-slug?utm_source=newsletter",
+    "custom_alias": "spring-sale",
+    "expires_in_minutes": 60,
+}
+
+
+def test_link_create_validation(benchmark):
+    link = benchmark(LinkCreate, **PAYLOAD)
+    assert link.custom_alias == "spring-sale"
+
+
+def test_link_response_from_orm(benchmark):
+    link = Link(
+        original_url=PAYLOAD["original_url"],
+        short_code="100000",
+        created_at=datetime(2024, 5, 1, 12, 0),
+        owner_id=1,
+    )
+    response = benchmark(lambda: LinkResponse.model_validate(link).model_dump_json())
+    assert '"short_code":"100000"' in response
@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.core.security import create_access_token, decode_token
+
+
+def test_create_access_token(benchmark):
+    assert benchmark(create_access_token, {"sub": "user@example.com"})
+
+
+def test_decode_token(benchmark):
+    token = create_access_token({"sub": "user@example.com"})
+    assert benchmark(decode_token, token)["sub"] == "user@example.com"
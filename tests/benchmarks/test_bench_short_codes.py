@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.core.short_codes import (
+    LocalLeaseStore, SequenceCodeGenerator, encode_base62, generate_short_code, permute_sequence, sequence_key
+)
+
+
+def test_generate_short_code(benchmark):
+    assert len(benchmark(generate_short_code)) == 6
+
+
+def test_encode_base62(benchmark):
+    assert len(benchmark(encode_base62, 62 ** 5 + 123456)) == 6
+
+
+def test_permute_sequence(benchmark):
+    assert len(benchmark(permute_sequence, 123456, sequence_key("bench"))) == 6
+
+
+def test_sequence_generator_local_block(benchmark, run):
+    generator = SequenceCodeGenerator(block_size=1000, store=LocalLeaseStore())
+    assert len(benchmark(lambda: run(generator.generate()))) >= 6
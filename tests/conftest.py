@@ -0,0 +1,54 @@
+import os
+import pytest
+from dotenv import dotenv_values
+
+# Модули app.core.* читают настройки при импорте, подставляем тестовые значения.
+# Заданное в окружении или .env (его используют функциональные тесты) не трогаем:
+# переменная окружения перекрыла бы значение из .env
+TEST_SETTINGS = {
+    "DATABASE_URL": "sqlite://",
+    "REDIS_URL": "redis://localhost:6379",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_DB": "test_url_shortener",
+}
+env_file = dotenv_values(".env")
+for name, value in TEST_SETTINGS.items():
+    if name not in env_file:
+        os.environ.setdefault(name, value)
+
+
+class RecordingPipeline:
+    """Pipeline Redis, который только запоминает команды"""
+
+    def __init__(self):
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, *args))
+
+    async def execute(self):
+        return []
+
+
+class RecordingRedis:
+    """Асинхронный клиент Redis, у которого все pipeline пишут в один RecordingPipeline"""
+
+    def __init__(self):
+        self.pipe = RecordingPipeline()
+
+    def pipeline(self, transaction=True):
+        return self.pipe
+
+
+@pytest.fixture
+def recording_pipeline(monkeypatch):
+    """Команды, которые CacheInvalidation.execute() отправляет в Redis"""
+    import app.core.invalidation as invalidation_module
+
+    client = RecordingRedis()
+    monkeypatch.setattr(invalidation_module, "async_redis_client", client)
+    return client.pipe
@@ -0,0 +1,27 @@
+import json
+
+
+def test_create_links_batch(client):
+    response = client.post(
+        "/links/shorten/batch",
+        json={"items": [
+            {"original_url": "https://example.com", "custom_alias": "batchlink"},
+            {"original_url": "https://example.org"},
+            {"original_url": "https://example.net", "custom_alias": "batchlink"},
+        ]}
+    )
+    assert response.status_code == 200
+    statuses = [item["status"] for item in response.json()]
+    assert statuses == ["created", "created", "conflict"]
+
+
+def test_create_links_batch_stream(client):
+    body = "\n".join([
+        json.dumps({"original_url": "https://example.com"}),
+        "not json",
+        json.dumps({"original_url": "https://example.com", "custom_alias": "batchlink"}),
+    ])
+    response = client.post("/links/shorten/batch/stream", content=body)
+    assert response.status_code == 200
+    results = {item["index"]: item["status"] for item in map(json.loads, response.text.splitlines())}
+    assert results == {0: "created", 1: "invalid", 2: "conflict"}
@@ -0,0 +1,28 @@
+def login(client, email):
+    client.post("/register", json={"email": email, "password": "abcabc"})
+    token = client.post("/login", data={"username": email, "password": "abcabc"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_bulk_update_and_delete(client):
+    headers = login(client, "bulk@mail.ru")
+    created = client.post(
+        "/links/shorten/batch",
+        json={"items": [{"original_url": f"https://example.com/{i}"} for i in range(3)]},
+        headers=headers,
+    ).json()
+    codes = [item["short_code"] for item in created]
+
+    response = client.post(
+        "/links/batch/update",
+        json={"items": [{"short_code": codes[0], "new_url": "https://example.org/"}]},
+        headers=headers,
+    )
+    assert response.json() == {"affected": [codes[0]], "not_found": []}
+
+    response = client.post(
+        "/links/batch/delete", json={"short_codes": codes + ["missing"]}, headers=headers
+    )
+    assert sorted(response.json()["affected"]) == sorted(codes)
+    assert response.json()["not_found"] == ["missing"]
+    assert client.get(f"/links/{codes[1]}", follow_redirects=False).status_code == 404
@@ -0,0 +1,29 @@
+def test_list_my_links_by_cursor(client):
+    client.post("/register", json={"email": "mine@mail.ru", "password": "abcabc"})
+    token = client.post(
+        "/login", data={"username": "mine@mail.ru", "password": "abcabc"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    client.post(
+        "/links/shorten/batch",
+        json={"items": [{"original_url": f"https://example.com/{i}"} for i in range(5)]},
+        headers=headers,
+    )
+
+    codes = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/links/mine", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        codes += [item["short_code"] for item in page["items"]]
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert len(codes) == len(set(codes)) == 5
+
+
+def test_list_my_links_requires_auth(client):
+    assert client.get("/links/mine").status_code == 401
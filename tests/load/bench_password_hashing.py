@@ -0,0 +1,125 @@
+"""
+Бенчмарк изоляции bcrypt от остальных запросов.
+
+Без аргументов моделирует в одном процессе шторм логинов (--logins одновременных
+проверок пароля) и параллельно меряет задержку "редиректа" - короткой задачи
+в общем threadpool обработчиков. Сравниваются старый вариант (bcrypt в общем
+threadpool) и отдельный ограниченный пул PasswordHasher:
+    python tests/load/bench_password_hashing.py --logins 200
+
+С --url то же самое против запущенного сервиса: шторм POST /login
+и замеры GET /links/{code}:
+    python tests/load/bench_password_hashing.py --url http://localhost:8000 \\
+        --email user@example.com --password secret --short-code abc123
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import bcrypt
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.security import PasswordHasher, PasswordHasherBusy, verify_password
+
+
+def percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)]
+    return f"p50={p50 * 1000:8.2f}ms p99={p99 * 1000:8.2f}ms"
+
+
+async def probe(latencies: list[float], request, stop: asyncio.Event, interval: float):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await request()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def simulate(mode: str, logins: int, workers: int, max_pending: int) -> tuple[list[float], int]:
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(12)).decode()
+    hasher = PasswordHasher(workers, max_pending)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        if mode == "shared":
+            await run_in_threadpool(verify_password, "secret", hashed)
+            return
+        try:
+            await hasher.run(verify_password, "secret", hashed)
+        except PasswordHasherBusy:
+            rejected += 1
+
+    async def redirect():
+        await run_in_threadpool(lambda: None)
+
+    latencies = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(latencies, redirect, stop, 0.005))
+    await asyncio.gather(*[login() for _ in range(logins)])
+    stop.set()
+    await prober
+    return latencies, rejected
+
+
+async def against_server(args):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        statuses = {}
+
+        async def login():
+            response = await client.post("/login", data={"username": args.email, "password": args.password})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def redirect():
+            await client.get(f"/links/{args.short_code}", follow_redirects=False)
+
+        baseline = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(baseline, redirect, stop, 0.005))
+        await asyncio.sleep(2)
+        stop.set()
+        await prober
+
+        latencies = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(latencies, redirect, stop, 0.005))
+        await asyncio.gather(*[login() for _ in range(args.logins)])
+        stop.set()
+        await prober
+
+    print(f"redirect idle          {percentiles(baseline)}")
+    print(f"redirect during logins {percentiles(latencies)}  login statuses {statuses}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=32)
+    parser.add_argument("--url")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--short-code")
+    args = parser.parse_args()
+
+    if args.url:
+        await against_server(args)
+        return
+
+    for mode in ("shared", "dedicated"):
+        latencies, rejected = await simulate(mode, args.logins, args.workers, args.max_pending)
+        print(f"{mode:<10} redirect {percentiles(latencies)}  rejected logins {rejected}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,287 @@
+"""
+Нагрузочный сценарий со смесью запросов поверх данных seed_links.py.
+
+Редиректы идут по ключам с распределением Ципфа (малая доля кодов получает
+большую часть переходов, как у настоящих сокращателей), параллельно владельцы
+читают статистику, ищут ссылки, создают, меняют и удаляют свои ссылки.
+Созданные прогоном ссылки меняются и удаляются им же, засеянные данные не портятся.
+
+Фазы cold и warm гоняют одинаковую нагрузку: cold сразу после сброса кэшей,
+warm следом по прогретым. --redis-url сбрасывает ключи кэша в Redis перед cold;
+L1-кэши живут в процессах API, поэтому для честного cold сервис нужно перезапустить.
+
+Последовательность операций задаётся --seed, поэтому отчёты разных прогонов
+сравнимы. --baseline сравнивает p99 и RPS с сохранённым --json отчётом
+и завершается с кодом 1 при деградации больше --tolerance:
+    python tests/load/seed_links.py --links 1000000 --users 1000
+    python tests/load/bench_workload.py http://localhost:8000 --links 1000000 --users 1000 \\
+        --requests 200000 --concurrency 200 --redis-url redis://localhost:6379 --json after.json \\
+        --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from bisect import bisect_left
+from itertools import accumulate
+
+import httpx
+
+from load_data import URL_TEMPLATE, load_code, load_email
+
+DEFAULT_MIX = "redirect=90,stats=4,search=2,create=2,update=1,delete=1"
+CACHE_PATTERNS = ("redirect:*", "stats:*", "search:*", "user_links:*")
+
+
+class ZipfSampler:
+    """Номер ссылки с вероятностью ранга 1/rank**s; ранги случайно разбросаны по ключам"""
+
+    def __init__(self, size: int, exponent: float, rng: random.Random):
+        self._cdf = list(accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+        self._keys = list(range(size))
+        rng.shuffle(self._keys)
+
+    def sample(self, rng: random.Random) -> int:
+        rank = bisect_left(self._cdf, rng.random() * self._cdf[-1])
+        return self._keys[min(rank, len(self._keys) - 1)]
+
+
+def parse_mix(mix: str) -> tuple[list[str], list[float]]:
+    operations, weights = [], []
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        operations.append(name.strip())
+        weights.append(float(weight))
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return operations, list(accumulate(weights))
+
+
+class Workload:
+    """Общее состояние прогона: сессии владельцев, созданные ссылки, замеры по операциям"""
+
+    def __init__(self, client: httpx.AsyncClient, args, zipf: ZipfSampler):
+        self.client = client
+        self.args = args
+        self.zipf = zipf
+        self.sessions: list[tuple[int, dict]] = []
+        self.created: list[tuple[str, dict]] = []
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    async def login(self, user: int):
+        response = await self.client.post(
+            "/login", data={"username": load_email(user), "password": self.args.password}
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        self.sessions.append((user, headers))
+
+    async def measure(self, operation: str, request) -> httpx.Response | None:
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await request
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.latencies.setdefault(operation, []).append(time.perf_counter() - started)
+        if failed:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+        return response
+
+    async def redirect(self, rng: random.Random):
+        code = load_code(self.zipf.sample(rng))
+        await self.measure("redirect", self.client.get(f"/links/{code}", follow_redirects=False))
+
+    async def stats(self, rng: random.Random):
+        user, headers = rng.choice(self.sessions)
+        owned = (self.args.links - user - 1) // self.args.users + 1
+        code = load_code(user + self.args.users * rng.randrange(owned))
+        await self.measure("stats", self.client.get(f"/links/{code}/stats", headers=headers))
+
+    async def search(self, rng: random.Random):
+        url = URL_TEMPLATE.format(self.zipf.sample(rng))
+        await self.measure("search", self.client.get("/links/links/search", params={"original_url": url}))
+
+    async def create(self, rng: random.Random):
+        _, headers = rng.choice(self.sessions)
+        url = f"https://example.com/load/new/{uuid.UUID(int=rng.getrandbits(128))}"
+        response = await self.measure(
+            "create", self.client.post("/links/shorten", json={"original_url": url}, headers=headers)
+        )
+        if response is not None and response.status_code == 200:
+            self.created.append((response.json()["short_code"], headers))
+
+    async def update(self, rng: random.Random):
+        if not self.created:
+            return await self.create(rng)
+        code, headers = rng.choice(self.created)
+        url = f"https://example.com/load/updated/{uuid.UUID(int=rng.getrandbits(128))}"
+        await self.measure("update", self.client.put(f"/links/{code}", json={"new_url": url}, headers=headers))
+
+    async def delete(self, rng: random.Random):
+        if not self.created:
+            return await self.create(rng)
+        code, headers = self.created.pop(rng.randrange(len(self.created)))
+        await self.measure("delete", self.client.delete(f"/links/{code}", headers=headers))
+
+
+OPERATIONS = {
+    "redirect": Workload.redirect,
+    "stats": Workload.stats,
+    "search": Workload.search,
+    "create": Workload.create,
+    "update": Workload.update,
+    "delete": Workload.delete,
+}
+
+
+async def flush_cache(redis_url: str):
+    import redis.asyncio as redis
+
+    client = redis.from_url(redis_url)
+    removed = 0
+    for pattern in CACHE_PATTERNS:
+        batch = []
+        async for key in client.scan_iter(match=pattern, count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                removed += await client.unlink(*batch)
+                batch = []
+        if batch:
+            removed += await client.unlink(*batch)
+    await client.aclose()
+    print(f"flushed {removed} cache keys")
+
+
+def summarize(latencies: list[float]) -> dict:
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": quantiles[49] * 1000,
+        "p90_ms": quantiles[89] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+async def run_phase(workload: Workload, name: str, operations: list[str], weights: list[float]) -> dict:
+    args = workload.args
+    workload.latencies, workload.errors = {}, {}
+    queue = iter(range(args.requests))
+
+    async def worker(worker_id: int):
+        # Одинаковая последовательность в каждой фазе: warm повторяет запросы cold по прогретому кэшу
+        rng = random.Random(f"{args.seed}:{worker_id}")
+        for _ in queue:
+            operation = operations[bisect_left(weights, rng.random() * weights[-1])]
+            await OPERATIONS[operation](workload, rng)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(samples) for samples in workload.latencies.values())
+    report = {"seconds": elapsed, "rps": total / elapsed, "operations": {}}
+    for operation, samples in sorted(workload.latencies.items()):
+        report["operations"][operation] = {
+            "count": len(samples),
+            "errors": workload.errors.get(operation, 0),
+            "rps": len(samples) / elapsed,
+            **summarize(samples),
+        }
+    return report
+
+
+def print_phase(name: str, report: dict):
+    print(f"\n{name}: {report['rps']:.0f} req/s over {report['seconds']:.1f}s")
+    print(f"{'operation':<10} {'count':>8} {'errors':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for operation, row in report["operations"].items():
+        print(
+            f"{operation:<10} {row['count']:>8} {row['errors']:>7} {row['p50_ms']:>9.2f} "
+            f"{row['p90_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}"
+        )
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Деградации относительно базового отчёта: рост p99 и падение RPS больше tolerance"""
+    regressions = []
+    for phase, current in report["phases"].items():
+        previous = baseline["phases"].get(phase)
+        if previous is None:
+            continue
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{phase}: rps {previous['rps']:.0f} -> {current['rps']:.0f}")
+        for operation, row in current["operations"].items():
+            before = previous["operations"].get(operation)
+            if before and row["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{phase} {operation}: p99 {before['p99_ms']:.2f}ms -> {row['p99_ms']:.2f}ms"
+                )
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url")
+    parser.add_argument("--links", type=int, default=1_000_000, help="как в seed_links.py")
+    parser.add_argument("--users", type=int, default=1000, help="как в seed_links.py")
+    parser.add_argument("--password", default="load-test-password")
+    parser.add_argument("--sessions", type=int, default=20, help="сколько владельцев логинятся")
+    parser.add_argument("--requests", type=int, default=100_000, help="запросов на фазу")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--zipf", type=float, default=1.1, help="показатель распределения Ципфа")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--phases", default="cold,warm")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--redis-url", help="сбросить кэш в Redis перед фазой cold")
+    parser.add_argument("--json", help="сохранить отчёт")
+    parser.add_argument("--baseline", help="отчёт для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    operations, weights = parse_mix(args.mix)
+    started = time.perf_counter()
+    zipf = ZipfSampler(args.links, args.zipf, random.Random(args.seed))
+    print(f"zipf sampler over {args.links} links in {time.perf_counter() - started:.1f}s")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        response = await client.get(f"/links/{load_code(0)}", follow_redirects=False)
+        if response.status_code >= 400:
+            raise SystemExit(f"{load_code(0)} -> {response.status_code}: run seed_links.py and restart the API")
+
+        workload = Workload(client, args, zipf)
+        users = random.Random(args.seed).sample(range(args.users), min(args.sessions, args.users))
+        await asyncio.gather(*(workload.login(user) for user in users))
+
+        report = {"config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")}, "phases": {}}
+        for phase in args.phases.split(","):
+            if phase == "cold" and args.redis_url:
+                await flush_cache(args.redis_url)
+            report["phases"][phase] = await run_phase(workload, phase, operations, weights)
+            print_phase(phase, report["phases"][phase])
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
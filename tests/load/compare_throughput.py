@@ -0,0 +1,83 @@
+"""
+Сравнение пропускной способности API: запускает одинаковую нагрузку
+на несколько инстансов и печатает RPS и перцентили задержки.
+
+Пример (синхронная версия на 8001, асинхронная на 8000):
+    python tests/load/compare_throughput.py http://localhost:8001 http://localhost:8000 \
+        --requests 5000 --concurrency 100
+
+Инстансы должны работать с настоящими PostgreSQL и Redis: на SQLite и fakeredis
+скрипт проверяет только сам себя, цифры не показательны
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+
+async def prepare_link(client: httpx.AsyncClient) -> str:
+    alias = uuid.uuid4().hex[:12]
+    response = await client.post(
+        "/links/shorten",
+        json={"original_url": "https://example.com", "custom_alias": alias},
+    )
+    response.raise_for_status()
+    return alias
+
+
+async def run(base_url: str, total: int, concurrency: int, path: str | None) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        path = path or f"/links/{await prepare_link(client)}"
+        latencies = []
+        errors = 0
+        queue = iter(range(total))
+
+        async def worker():
+            nonlocal errors
+            for _ in queue:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, follow_redirects=False)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "url": base_url + path,
+        "rps": total / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base_urls", nargs="+")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--path", help="Путь для нагрузки, по умолчанию редирект по новой ссылке")
+    args = parser.parse_args()
+
+    print(f"{'url':<50} {'rps':>10} {'p50, ms':>10} {'p99, ms':>10} {'errors':>8}")
+    for base_url in args.base_urls:
+        result = asyncio.run(run(base_url, args.requests, args.concurrency, args.path))
+        print(
+            f"{result['url']:<50} {result['rps']:>10.1f} {result['p50_ms']:>10.2f} "
+            f"{result['p99_ms']:>10.2f} {result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Схема данных нагрузочного стенда, общая для seed_links.py и bench_workload.py.
+Без зависимостей от приложения, чтобы генератор нагрузки запускался на любой машине:
+    пользователь u: load-user-{u}@example.com
+    ссылка i: код ld-{base62(i)}, URL https://example.com/load/{i}, владелец i % users
+"""
+
+import string
+
+# Тот же алфавит, что у app.core.short_codes.encode_base62
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+CODE_PREFIX = "ld-"
+EMAIL_TEMPLATE = "load-user-{}@example.com"
+URL_TEMPLATE = "https://example.com/load/{}"
+
+
+def encode_base62(number: int) -> str:
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return "".join(reversed(digits))
+
+
+def load_code(index: int) -> str:
+    return CODE_PREFIX + encode_base62(index)
+
+
+def load_email(user: int) -> str:
+    return EMAIL_TEMPLATE.format(user)
+
+
+def owner_of(index: int, users: int) -> int:
+    """Номер пользователя-владельца ссылки i"""
+    return index % users
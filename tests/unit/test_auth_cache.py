@@ -0,0 +1,22 @@
+from app.api import deps
+from app.core.security import create_access_token
+
+
+def test_verified_token_is_cached(monkeypatch):
+    token = create_access_token({"sub": "user@example.com"})
+    assert deps.resolve_token_email(token) == "user@example.com"
+
+    def fail(_):
+        raise AssertionError("token decoded twice")
+
+    monkeypatch.setattr(deps, "decode_token", fail)
+    assert deps.resolve_token_email(token) == "user@example.com"
+
+
+def test_invalid_token_is_not_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(deps, "decode_token", lambda token: calls.append(token))
+
+    assert deps.resolve_token_email("junk") is None
+    assert deps.resolve_token_email("junk") is None
+    assert len(calls) == 2
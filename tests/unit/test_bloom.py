@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.bloom import CountingBloomFilter, ShortCodeIndex
+from app.db.base import Base
+from app.db.models import Link
+
+
+def test_counting_bloom_filter_add_and_remove():
+    bloom = CountingBloomFilter(expected_items=1000, fp_rate=0.01)
+    codes = [f"code{i}" for i in range(1000)]
+    for code in codes:
+        bloom.add(code)
+
+    assert all(code in bloom for code in codes)
+    false_positives = sum(f"missing{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+    bloom.remove("code1")
+    assert "code1" not in bloom
+    assert "code2" in bloom
+
+
+def test_short_code_index_rebuild():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Link(original_url="https://example.com", short_code="alive"))
+    db.add(Link(
+        original_url="https://example.com", short_code="expired",
+        expires_at=datetime.utcnow() - timedelta(minutes=1)
+    ))
+    db.commit()
+
+    index = ShortCodeIndex()
+    assert index.might_exist("anything")
+
+    index.rebuild(db)
+    index.add("created")
+
+    assert index.might_exist("alive")
+    assert index.might_exist("created")
+    assert not index.might_exist("missing")
+    assert index.stats()["negative_lookups"] == 1
+
+    # Истёкший код остаётся в фильтре до удаления очисткой, её событие его и убирает
+    assert index.might_exist("expired")
+    index.remove("expired")
+    assert not index.might_exist("expired")
+    assert index.might_exist("alive")
+
+    index.invalidate()
+    assert index.might_exist("expired")
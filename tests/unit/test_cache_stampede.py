@@ -0,0 +1,71 @@
+import asyncio
+import app.core.redis as cache
+
+
+class FakeRedis:
+    def __init__(self, locked=False):
+        self.locked = locked
+        self.values = {}
+
+    async def set(self, key, value, nx=False, px=None):
+        if self.locked:
+            return None
+        self.locked = True
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        self.locked = False
+        return 1
+
+    async def get(self, key):
+        return self.values.get(key)
+
+
+def test_rebuild_once_coalesces_concurrent_misses(monkeypatch):
+    monkeypatch.setattr(cache, "async_redis_client", FakeRedis())
+    calls = 0
+
+    async def rebuild():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return b"value"
+
+    async def read_cache():
+        return None
+
+    async def run():
+        return await asyncio.gather(*[
+            cache.rebuild_once("redirect:abc", rebuild, read_cache) for _ in range(10)
+        ])
+
+    assert asyncio.run(run()) == [b"value"] * 10
+    assert calls == 1
+    assert "redirect" in cache.rebuild_seconds
+
+
+def test_rebuild_once_waits_for_other_process(monkeypatch):
+    fake = FakeRedis(locked=True)
+    monkeypatch.setattr(cache, "async_redis_client", fake)
+    monkeypatch.setattr(cache.settings, "CACHE_REBUILD_POLL_MS", 1)
+
+    async def rebuild():
+        raise AssertionError("lock holder rebuilds the entry")
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.02, fake.values.__setitem__, "stats:abc", b"fresh")
+        stale = await cache.rebuild_once("stats:abc", rebuild, lambda: fake.get("stats:abc"), stale=b"old")
+        fresh = await cache.rebuild_once("stats:abc", rebuild, lambda: fake.get("stats:abc"))
+        return stale, fresh
+
+    assert asyncio.run(run()) == (b"old", b"fresh")
+
+
+def test_should_refresh_early(monkeypatch):
+    monkeypatch.setitem(cache.rebuild_seconds, "redirect", 0.1)
+    assert not cache.should_refresh_early("redirect", -2)
+    assert not cache.should_refresh_early("stats", 1000)
+    refreshes = sum(cache.should_refresh_early("redirect", 10) for _ in range(1000))
+    assert refreshes > 800
+    refreshes = sum(cache.should_refresh_early("redirect", 60_000) for _ in range(1000))
+    assert refreshes == 0
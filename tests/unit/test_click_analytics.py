@@ -0,0 +1,68 @@
+import pytest
+import app.core.click_analytics as click_analytics
+from app.core.click_analytics import classify_user_agent, country_code, referrer_host, rollup_click_events
+from app.core.config import settings
+
+
+def test_classify_user_agent():
+    assert classify_user_agent(None) == "unknown"
+    assert classify_user_agent("Googlebot/2.1 (+http://www.google.com/bot.html)") == "bot"
+    assert classify_user_agent("Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X)") == "tablet"
+    assert classify_user_agent("Mozilla/5.0 (Linux; Android 14) Mobile Safari") == "mobile"
+    assert classify_user_agent("Mozilla/5.0 (Windows NT 10.0; Win64; x64)") == "desktop"
+
+
+def test_referrer_host():
+    assert referrer_host(None) == "direct"
+    assert referrer_host("https://News.example.com/path?q=1") == "news.example.com"
+
+
+def test_rollup_click_events_into_buckets():
+    # 2026-01-01 00:00:30 и 00:01:10 UTC
+    start = 1767225600
+    events = [
+        ("abc", start + 30, "https://t.co/x", "curl/8.0", None),
+        ("abc", start + 70, None, "Mozilla/5.0 (iPhone)", "DE"),
+    ]
+    rollups = rollup_click_events(events)
+
+    minute = rollups[f"clicks:ts:abc:minute:{start}"]
+    assert minute[f"{start}:total"] == 1
+    assert minute[f"{start + 60}:total"] == 1
+    assert minute[f"{start + 60}:country:DE"] == 1
+
+    day = next(fields for key, fields in rollups.items() if ":day:" in key)
+    assert day[f"{start}:total"] == 2
+    assert day[f"{start}:ref:t.co"] == 1
+    assert day[f"{start}:ref:direct"] == 1
+    assert day[f"{start}:ua:bot"] == 1
+    assert day[f"{start}:ua:mobile"] == 1
+
+
+def test_country_code():
+    assert country_code(" de ") == "DE"
+    assert country_code(None) == "unknown"
+    assert country_code("Germany") == "unknown"
+    assert country_code("T1") == "unknown"
+
+
+def test_push_click_events_caps_referrers_per_bucket(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(click_analytics, "redis_client", redis)
+    monkeypatch.setattr(settings, "CLICK_SERIES_MAX_REFERRERS", 2)
+
+    start = 1767225600
+    events = [("abc", start, "https://popular.example/", None, None)] * 3
+    events += [("abc", start, f"https://site{i}.example/", None, None) for i in range(5)]
+    click_analytics.push_click_events(events)
+    # Уже известный хост учитывается и после заполнения корзины
+    click_analytics.push_click_events([("abc", start, "https://popular.example/", None, None)])
+
+    day = next(key for key in redis.keys() if b":day:" in key)
+    fields = {field.decode(): int(count) for field, count in redis.hgetall(day).items()}
+    referrers = {field: count for field, count in fields.items() if ":ref:" in field}
+    assert len(referrers) == 3
+    assert referrers[f"{start}:ref:popular.example"] == 4
+    assert referrers[f"{start}:ref:other"] == 4
@@ -0,0 +1,81 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import app.core.clicks as clicks
+from app.core.clicks import ClickBuffer
+from app.crud.crud_link import apply_click_deltas
+from app.db.base import Base
+from app.db.models import Link
+
+
+def test_click_buffer_aggregates_by_code():
+    buffer = ClickBuffer(max_codes=10)
+    earlier = datetime(2025, 1, 1, 12, 0)
+    later = earlier + timedelta(minutes=5)
+
+    buffer.add("abc123", accessed_at=later)
+    buffer.add("abc123", accessed_at=earlier)
+    buffer.add("xyz789", accessed_at=earlier)
+
+    pending = buffer.drain()
+    assert pending == {"abc123": (2, later), "xyz789": (1, earlier)}
+    assert len(buffer) == 0
+
+
+def test_click_buffer_overflow():
+    buffer = ClickBuffer(max_codes=1)
+
+    assert buffer.add("abc123")
+    assert buffer.add("abc123")
+    assert not buffer.add("xyz789")
+    assert buffer.dropped == 1
+
+
+def test_apply_click_deltas():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    old_access = datetime(2025, 1, 1, 12, 0)
+    db.add_all([
+        Link(original_url="https://example.com", short_code="abc123", access_count=3, last_accessed=old_access),
+        Link(original_url="https://example.org", short_code="xyz789"),
+    ])
+    db.commit()
+
+    new_access = old_access + timedelta(hours=1)
+    updated = apply_click_deltas(db, {
+        "abc123": (2, old_access - timedelta(hours=1)),
+        "xyz789": (5, new_access),
+        "missing": (1, new_access),
+    })
+    assert sorted(code for code, _ in updated) == ["abc123", "xyz789"]
+
+    links = {link.short_code: link for link in db.query(Link).all()}
+    assert links["abc123"].access_count == 5
+    assert links["abc123"].last_accessed == old_access
+    assert links["xyz789"].access_count == 5
+    assert links["xyz789"].last_accessed == new_access
+
+
+def test_take_pending_clicks_tolerates_missing_key_and_sweeps_leftovers(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(clicks, "redis_client", redis)
+
+    # Счётчик без ZSET времени: раньше RENAME второго ключа падал
+    redis.hincrby(clicks.PENDING_COUNT_KEY, "abc123", 2)
+    # Ключи упавшего запуска и ключи запуска, который ещё пишет в БД
+    redis.hset("clicks:draining:count:100:crashed", "abc123", 3)
+    redis.zadd("clicks:draining:last:100:crashed", {"abc123": 1735732800})
+    redis.hset(f"clicks:draining:count:{int(time.time())}:running", "abc123", 100)
+
+    pending, draining_keys = clicks.take_pending_clicks()
+
+    assert pending["abc123"][0] == 5
+    assert "clicks:draining:count:100:crashed" in draining_keys
+    assert not any(key.endswith(":running") for key in draining_keys)
+    assert not redis.exists(clicks.PENDING_COUNT_KEY)
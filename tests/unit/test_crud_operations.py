@@ -1,3 +1,5 @@
+import asyncio
+import pytest
 from app.crud.crud_link import create_link, get_link_by_short_code, update_link, delete_link
 from app.schemas.link import LinkCreate
 from sqlalchemy.orm import Session
@@ -43,3 +45,65 @@ def test_update_link():
 #     result = delete_link(db, short_code, owner_id)
 #     assert not result
 
+
+
+class RepeatingGenerator:
+    """Генератор, который выдаёт коды из списка, в том числе повторы"""
+
+    def __init__(self, codes):
+        self.codes = iter(codes)
+
+    async def generate(self):
+        return next(self.codes)
+
+
+def test_bulk_create_regenerates_codes_repeated_within_batch(monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.crud import async_crud_link
+    from app.db.base import Base
+
+    monkeypatch.setattr(
+        async_crud_link, "short_code_generator", RepeatingGenerator(["dup111", "dup111", "alias1", "new222"])
+    )
+    links = [
+        LinkCreate(original_url="https://example.com/1"),
+        LinkCreate(original_url="https://example.com/2"),
+        LinkCreate(original_url="https://example.com/3", custom_alias="alias1"),
+    ]
+
+    async def create():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            results = await async_crud_link.create_links_bulk(db, links)
+        await engine.dispose()
+        return results
+
+    results = asyncio.run(create())
+    assert [result["status"] for result in results] == ["created"] * 3
+    assert [result["short_code"] for result in results] == ["dup111", "new222", "alias1"]
+
+
+def test_bulk_update_returns_previous_url_hash():
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.crud import async_crud_link
+    from app.core.urls import url_hash
+    from app.db.base import Base
+    from app.db.models import Link
+
+    async def update():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            db.add(Link(original_url="https://example.com/old", url_hash=url_hash("https://example.com/old"),
+                        short_code="abc123", owner_id=1))
+            await db.commit()
+            updated = await async_crud_link.update_links_bulk(db, 1, {"abc123": "https://example.com/new"})
+        await engine.dispose()
+        return updated
+
+    assert asyncio.run(update()) == [("abc123", None, url_hash("https://example.com/old"))]
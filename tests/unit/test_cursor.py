@@ -0,0 +1,23 @@
+import pytest
+from fastapi import HTTPException
+from app.api.endpoints.links import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor([42]), "id") == (42,)
+    assert decode_cursor(encode_cursor([7, 42]), "access_count") == (7, 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    "bnVsbA==",                    # null
+    "NQ==",                        # 5
+    "not base64!",
+    encode_cursor([True]),
+    encode_cursor([2 ** 40]),
+    encode_cursor(["1"]),
+    encode_cursor([1, 2]),
+])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "id")
+    assert error.value.status_code == 400
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.crud.crud_link import delete_expired_links
+from app.db.base import Base
+from app.db.models import Link
+
+
+def test_delete_expired_links_in_batches():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    expired = datetime.utcnow() - timedelta(minutes=1)
+    db.add_all([
+        Link(original_url="https://example.com", short_code=f"old{i}", expires_at=expired)
+        for i in range(5)
+    ])
+    db.add(Link(original_url="https://example.com", short_code="alive", expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.add(Link(original_url="https://example.com", short_code="forever"))
+    db.commit()
+
+    first = delete_expired_links(db, limit=3)
+    second = delete_expired_links(db, limit=3)
+    third = delete_expired_links(db, limit=3)
+
+    assert len(first) == 3
+    assert len(second) == 2
+    assert third == []
+    assert {link.short_code for link in db.query(Link).all()} == {"alive", "forever"}
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+import app.core.invalidation as invalidation_module
+import app.core.redis as cache
+from app.core.config import settings
+from app.core.invalidation import CacheInvalidation
+
+
+def test_invalidation_groups_keys_and_writes_through(recording_pipeline):
+    invalidation = CacheInvalidation()
+    invalidation.link("abc", owner_id=1)
+    invalidation.write_redirect("abc", "https://example.com/new", None)
+    invalidation.link("old", owner_id=1, removed=True)
+
+    asyncio.run(invalidation.execute())
+
+    unlink = [command for command in recording_pipeline.commands if command[0] == "unlink"]
+    assert len(unlink) == 1
+    assert set(unlink[0][1:]) == {"stats:abc:1", "user_links:1", "redirect:old", "stats:old:1"}
+    assert ("setex", "redirect:abc", settings.REDIRECT_CACHE_TTL_SECONDS, "https://example.com/new") in recording_pipeline.commands
+    publishes = [command[1:] for command in recording_pipeline.commands if command[0] == "publish"]
+    assert publishes == [
+        ("cache:invalidate", "redirect:abc"),
+        ("cache:invalidate", "redirect:old"),
+        ("shortcodes:events", "-old"),
+    ]
+
+
+def test_search_is_invalidated_for_old_and_new_url(recording_pipeline):
+    invalidation = CacheInvalidation()
+    invalidation.link("abc", url_hashes=["old", "new", None])
+
+    asyncio.run(invalidation.execute())
+
+    unlink = [command for command in recording_pipeline.commands if command[0] == "unlink"]
+    assert set(unlink[0][1:]) == {"redirect:abc", "search:old", "search:new"}
+
+
+def test_stale_user_links_page_is_not_cached(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(cache, "async_redis_client", redis)
+    monkeypatch.setattr(invalidation_module, "async_redis_client", redis)
+
+    async def scenario():
+        _, version = await cache.get_user_links_page(1, "page")
+        # Пока страница читалась из БД, владелец создал ссылку
+        invalidation = CacheInvalidation()
+        invalidation.created("new", "https://example.com", None, owner_id=1)
+        await invalidation.execute()
+        await cache.cache_user_links_page(1, "page", "stale", version)
+        stale = await redis.hget("user_links:1", "page")
+
+        _, version = await cache.get_user_links_page(1, "page")
+        await cache.cache_user_links_page(1, "page", "fresh", version)
+        return stale, await cache.get_user_links_page(1, "page")
+
+    stale, (fresh, _) = asyncio.run(scenario())
+    assert stale is None
+    assert fresh == b"fresh"
@@ -0,0 +1,38 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.db.session import LazySession
+
+
+def test_session_is_created_on_first_use():
+    created = []
+    factory = sessionmaker(bind=create_engine("sqlite://"))
+
+    def tracking_factory():
+        created.append(True)
+        return factory()
+
+    db = LazySession(tracking_factory)
+    assert created == [] and db.checkouts == 0
+
+    db.execute(text("SELECT 1"))
+    db.commit()
+    db.execute(text("SELECT 1"))
+    db.close()
+
+    assert len(created) == 1
+    assert db.checkouts == 2
+
+
+def test_jobs_do_not_record_request_checkouts(monkeypatch):
+    from app.core import tasks
+    from app.core.metrics import db_checkouts_per_request
+    from app.db.base import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    observed = []
+    monkeypatch.setattr(tasks, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(db_checkouts_per_request, "observe", lambda *args: observed.append(args))
+
+    assert tasks.delete_expired_links() == 0
+    assert observed == []
@@ -0,0 +1,37 @@
+import time
+from app.core.local_cache import LocalCache
+
+
+def test_local_cache_lru_eviction():
+    cache = LocalCache(max_entries=2, max_bytes=1024, ttl=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert cache.evictions == 1
+
+
+def test_local_cache_max_bytes():
+    cache = LocalCache(max_entries=10, max_bytes=10, ttl=60)
+    cache.set("a", b"x" * 6)
+    cache.set("b", b"y" * 6)
+
+    assert cache.get("a") is None
+    assert cache.size_bytes == 6
+
+
+def test_local_cache_ttl_and_delete():
+    cache = LocalCache(max_entries=10, max_bytes=1024, ttl=60)
+    cache.set("a", b"1", ttl=0.01)
+    cache.set("b", b"2")
+    time.sleep(0.02)
+    cache.delete("b")
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["invalidations"] == 1
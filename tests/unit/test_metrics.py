@@ -0,0 +1,45 @@
+import pytest
+from app.core import metrics
+from app.core.metrics import Counter, Histogram, track_job
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+
+
+def test_counter_renders_labels():
+    lookups = Counter("test_lookups_total", "Lookups", ("cache", "result"))
+    lookups.inc("redirect", "hit")
+    lookups.inc("redirect", "hit")
+    lookups.inc("redirect", "miss")
+
+    lines = lookups.collect()
+    assert '# TYPE test_lookups_total counter' in lines
+    assert 'test_lookups_total{cache="redirect",result="hit"} 2' in lines
+    assert 'test_lookups_total{cache="redirect",result="miss"} 1' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    latency = Histogram("test_latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/links/{short_code}")
+
+    lines = latency.collect()
+    assert 'test_latency_seconds_bucket{route="/links/{short_code}",le="0.1"} 2' in lines
+    assert 'test_latency_seconds_bucket{route="/links/{short_code}",le="1.0"} 3' in lines
+    assert 'test_latency_seconds_bucket{route="/links/{short_code}",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{route="/links/{short_code}"} 4' in lines
+
+
+def test_track_job_records_status(monkeypatch):
+    jobs = Histogram("test_job_seconds", "Jobs", ("job", "status"))
+    monkeypatch.setattr(metrics, "job_duration", jobs)
+
+    track_job("ok_job")(lambda: None)()
+    with pytest.raises(RuntimeError):
+        track_job("broken_job")(lambda: (_ for _ in ()).throw(RuntimeError()))()
+
+    lines = jobs.collect()
+    assert 'test_job_seconds_count{job="ok_job",status="ok"} 1' in lines
+    assert 'test_job_seconds_count{job="broken_job",status="error"} 1' in lines
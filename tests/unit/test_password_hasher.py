@@ -0,0 +1,22 @@
+import asyncio
+import threading
+import pytest
+from app.core.security import PasswordHasher, PasswordHasherBusy
+
+
+def test_password_hasher_rejects_over_queue_limit():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.ensure_future(hasher.run(release.wait))
+        second = asyncio.ensure_future(hasher.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.run(release.wait)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(run()) == [True, True]
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.pending == 0
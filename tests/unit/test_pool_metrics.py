@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.core.pool_metrics import TimedQueuePool, db_pool_stats
+
+
+def test_db_pool_stats():
+    engine = create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=2, max_overflow=1)
+
+    with engine.connect() as first, engine.connect() as second, engine.connect() as third:
+        first.execute(text("select 1"))
+        stats = db_pool_stats(engine.pool)
+        assert stats["checked_out"] == 3
+        assert stats["overflow"] == 1
+
+    stats = db_pool_stats(engine.pool)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 0
+
+
+def test_redis_pool_separates_exhaustion_from_connection_errors():
+    import redis
+    from app.core.pool_metrics import TimedRedisPool, redis_pool_stats
+
+    # Порт 1 закрыт: соединение не устанавливается
+    pool = TimedRedisPool(host="127.0.0.1", port=1, max_connections=1, timeout=0.01)
+    with pytest.raises(redis.exceptions.ConnectionError):
+        pool.get_connection()
+    stats = redis_pool_stats(pool)
+    assert (stats["timeouts"], stats["connection_errors"], stats["checked_out"]) == (0, 1, 0)
+
+    pool.pool.get()
+    with pytest.raises(redis.exceptions.ConnectionError):
+        pool.get_connection()
+    stats = redis_pool_stats(pool)
+    assert (stats["timeouts"], stats["connection_errors"]) == (1, 1)
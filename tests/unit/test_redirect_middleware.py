@@ -0,0 +1,65 @@
+import asyncio
+import app.api.redirect as redirect
+from app.core.config import settings
+from app.core.redis import REDIRECT_NOT_FOUND
+
+
+def make_lookup(values):
+    async def get_cached_url(short_code):
+        return values.get(short_code), False
+    return get_cached_url
+
+
+def call(middleware, path, method="GET"):
+    scope = {
+        "type": "http", "method": method, "path": path,
+        "headers": [(b"referer", b"https://ref.example/"), (b"user-agent", b"curl/8")],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return scope, messages
+
+
+def downstream(calls):
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+    return app
+
+
+def test_cache_hit_is_served_without_app(monkeypatch):
+    monkeypatch.setattr(redirect, "get_cached_url", make_lookup({"abc123": b"https://example.com/"}))
+    monkeypatch.setattr(settings, "REDIRECT_STATUS_CODE", 301)
+    monkeypatch.setattr(settings, "REDIRECT_CACHE_CONTROL", "public, max-age=300")
+    clicks = []
+    monkeypatch.setattr(redirect, "track_click", lambda headers, code: clicks.append((code, headers["referer"])))
+    calls = []
+
+    _, messages = call(redirect.RedirectMiddleware(downstream(calls)), "/links/abc123")
+
+    assert calls == []
+    assert messages[0]["status"] == 301
+    assert (b"location", b"https://example.com/") in messages[0]["headers"]
+    assert (b"cache-control", b"public, max-age=300") in messages[0]["headers"]
+    assert clicks == [("abc123", "https://ref.example/")]
+
+
+def test_miss_and_other_routes_fall_through(monkeypatch):
+    monkeypatch.setattr(redirect, "get_cached_url", make_lookup({"gone12": REDIRECT_NOT_FOUND}))
+    calls = []
+    middleware = redirect.RedirectMiddleware(downstream(calls))
+
+    scope, _ = call(middleware, "/links/abc123")
+    assert scope["state"][redirect.LOOKUP_STATE_KEY] == (None, False)
+    call(middleware, "/links/gone12")
+    call(middleware, "/links/mine")
+    call(middleware, "/links/abc123/stats")
+    call(middleware, "/links/abc123", method="DELETE")
+
+    assert calls == ["/links/abc123", "/links/gone12", "/links/mine", "/links/abc123/stats", "/links/abc123"]
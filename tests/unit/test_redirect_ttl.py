@@ -0,0 +1,35 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from app.core.config import settings
+from app.core.redis import redirect_ttl
+
+
+def test_redirect_ttl_without_expiry():
+    assert redirect_ttl(None) == settings.REDIRECT_CACHE_TTL_SECONDS
+
+
+def test_redirect_ttl_capped_by_expiry():
+    ttl = redirect_ttl(datetime.utcnow() + timedelta(minutes=5))
+    assert 290 < ttl <= 300
+
+
+def test_redirect_ttl_for_expired_link():
+    assert redirect_ttl(datetime.utcnow() - timedelta(minutes=5)) <= 0
+
+
+def test_missing_redirect_does_not_overwrite_fresh_url(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import app.core.redis as cache
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(cache, "async_redis_client", redis)
+
+    async def scenario():
+        # Ссылку записали в кэш, пока запрос на редирект читал БД без неё
+        await redis.set("redirect:fresh1", "https://example.com")
+        await cache.cache_missing_redirect("fresh1")
+        await cache.cache_missing_redirect("absent1")
+        return await redis.get("redirect:fresh1"), await redis.get("redirect:absent1")
+
+    assert asyncio.run(scenario()) == (b"https://example.com", cache.REDIRECT_NOT_FOUND)
+    assert cache.redirect_cache.get("fresh1") is None
@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, exc
+import app.db.session as session_module
+import app.core.invalidation as invalidation_module
+from app.core.invalidation import CacheInvalidation
+from app.db.session import ReplicaRouter
+
+
+def make_router(count, retry_seconds=30):
+    return ReplicaRouter([create_engine("sqlite://") for _ in range(count)], retry_seconds)
+
+
+def test_round_robin_skips_failed_replica():
+    router = make_router(3)
+    assert [router.pick() for _ in range(4)] == [0, 1, 2, 0]
+
+    router.mark_down(1)
+    assert [router.pick() for _ in range(4)] == [2, 0, 2, 0]
+    assert [replica["available"] for replica in router.stats()] == [True, False, True]
+
+
+def test_failed_replica_returns_after_retry_and_primary_is_fallback():
+    router = make_router(1, retry_seconds=0)
+    router.mark_down(0)
+    assert router.pick() == 0
+
+    router = make_router(1)
+    router.mark_down(0)
+    assert router.pick() is None
+    assert make_router(0).pick() is None
+
+
+def test_recent_write_is_marked_only_with_replicas(monkeypatch, recording_pipeline):
+    invalidation = CacheInvalidation()
+    invalidation.wrote("user@example.com")
+    assert not invalidation
+
+    monkeypatch.setattr(invalidation_module, "replicas", make_router(1))
+    invalidation = CacheInvalidation()
+    invalidation.wrote("user@example.com")
+    asyncio.run(invalidation.execute())
+    assert recording_pipeline.commands[0][:2] == ("setex", "recent_write:user@example.com")
+
+
+def make_error(invalidated):
+    return exc.OperationalError("SELECT 1", {}, Exception("boom"), connection_invalidated=invalidated)
+
+
+class FailingSession:
+    def __init__(self, error):
+        self.error = error
+        self.info = {}
+
+    async def execute(self, *args):
+        raise self.error
+
+    async def close(self):
+        pass
+
+
+class PrimarySession(FailingSession):
+    async def execute(self, *args):
+        return "primary"
+
+
+def use_replica(monkeypatch, error):
+    router = ReplicaRouter([create_engine("sqlite://")], retry_seconds=30)
+    router.sessionmakers = [lambda: FailingSession(error)]
+    monkeypatch.setattr(session_module, "replicas", router)
+    monkeypatch.setattr(session_module, "AsyncSessionLocal", lambda: PrimarySession(None))
+    return router
+
+
+def test_lost_replica_is_marked_down_and_read_retried_on_primary(monkeypatch):
+    router = use_replica(monkeypatch, make_error(invalidated=True))
+
+    async def read():
+        async with session_module.read_session() as db:
+            return await db.execute("SELECT 1")
+
+    assert asyncio.run(read()) == "primary"
+    assert router.stats()[0]["failures"] == 1
+
+
+def test_query_error_on_replica_keeps_it_available(monkeypatch):
+    router = use_replica(monkeypatch, make_error(invalidated=False))
+
+    async def read():
+        async with session_module.read_session() as db:
+            return await db.execute("SELECT 1")
+
+    with pytest.raises(exc.OperationalError):
+        asyncio.run(read())
+    assert router.stats()[0]["available"]
+
+
+class ReplicaSession(FailingSession):
+    async def execute(self, *args):
+        return "replica"
+
+
+class MarkerRedis:
+    """Метка recent_write появляется после заданного числа проверок"""
+
+    def __init__(self, appears_after):
+        self.checks = 0
+        self.appears_after = appears_after
+
+    async def exists(self, key):
+        self.checks += 1
+        return int(self.checks > self.appears_after)
+
+
+def test_prefer_primary_is_checked_on_first_query_only(monkeypatch):
+    router = use_replica(monkeypatch, None)
+    router.sessionmakers = [lambda: ReplicaSession(None)]
+    checks = []
+
+    async def recently_written():
+        checks.append(True)
+        return True
+
+    async def read(query):
+        async with session_module.read_session(prefer_primary=recently_written) as db:
+            return [await db.execute("SELECT 1") for _ in range(query)]
+
+    assert asyncio.run(read(0)) == []
+    assert checks == []
+    assert asyncio.run(read(2)) == ["primary", "primary"]
+    assert len(checks) == 1
+
+
+@pytest.mark.parametrize("appears_after, expected", [(0, "primary"), (1, "primary"), (2, "replica")])
+def test_read_for_cache_rereads_from_primary_after_invalidation(monkeypatch, appears_after, expected):
+    router = use_replica(monkeypatch, None)
+    router.sessionmakers = [lambda: ReplicaSession(None)]
+    monkeypatch.setattr(invalidation_module, "replicas", router)
+    monkeypatch.setattr(invalidation_module, "async_redis_client", MarkerRedis(appears_after))
+
+    result = asyncio.run(invalidation_module.read_for_cache(
+        session_module.read_session, "redirect:abc", lambda db: db.execute("SELECT 1")
+    ))
+    assert result == expected
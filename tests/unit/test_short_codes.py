@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from app.core.short_codes import (
+    BASE62_ALPHABET, encode_base62, LocalLeaseStore, MAX_WORKER_ID, permute_sequence, sequence_key,
+    SequenceCodeGenerator, SnowflakeCodeGenerator, WORKER_SLOT_PREFIX
+)
+
+
+def test_encode_base62():
+    assert encode_base62(0) == "0"
+    assert encode_base62(61) == "Z"
+    assert encode_base62(62) == "10"
+    assert len(encode_base62(62 ** 5)) == 6
+
+
+def test_sequence_permutation_hides_order():
+    key = sequence_key("test-secret")
+    codes = [permute_sequence(number, key) for number in range(1000)]
+    assert len(set(codes)) == 1000
+    assert all(len(code) == 6 for code in codes)
+
+    # Соседние номера не дают соседних кодов
+    values = [sum(BASE62_ALPHABET.index(c) * 62 ** i for i, c in enumerate(reversed(code))) for code in codes]
+    assert not any(abs(a - b) <= 1000 for a, b in zip(values, values[1:]))
+    # Другой ключ - другая перестановка
+    assert permute_sequence(0, sequence_key("other-secret")) != codes[0]
+    assert len(permute_sequence(62 ** 6, key)) == 8
+
+
+def test_sequence_generator_unique_across_blocks():
+    async def generate(count):
+        # Два воркера делят один счётчик
+        store = LocalLeaseStore()
+        first = SequenceCodeGenerator(block_size=10, store=store)
+        second = SequenceCodeGenerator(block_size=10, store=store)
+        return [await gen.generate() for _ in range(count) for gen in (first, second)]
+
+    codes = asyncio.run(generate(25))
+    assert len(set(codes)) == 50
+    assert all(len(code) >= 6 for code in codes)
+
+
+def test_snowflake_generator_unique():
+    async def generate(count):
+        store = LocalLeaseStore()
+        first = SnowflakeCodeGenerator(store=store)
+        second = SnowflakeCodeGenerator(store=store)
+        return [await gen.generate() for _ in range(count) for gen in (first, second)]
+
+    codes = asyncio.run(generate(5000))
+    assert len(set(codes)) == 10000
+
+
+def test_snowflake_fails_when_all_worker_ids_leased():
+    async def generate():
+        store = LocalLeaseStore()
+        for worker_id in range(MAX_WORKER_ID + 1):
+            await store.claim(f"{WORKER_SLOT_PREFIX}{worker_id}", "other", 60)
+        await SnowflakeCodeGenerator(store=store).generate()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(generate())
+
+
+def test_snowflake_reacquires_lost_worker_id():
+    async def generate():
+        store = LocalLeaseStore()
+        generator = SnowflakeCodeGenerator(store=store, ttl=60)
+        await generator.generate()
+        lost = generator.worker_id
+        # Аренду перехватил другой процесс, пока этот её не продлевал
+        store._claims[f"{WORKER_SLOT_PREFIX}{lost}"] = ("other", float("inf"))
+        generator._confirmed_until = 0
+        await generator.generate()
+        return lost, generator.worker_id
+
+    lost, current = asyncio.run(generate())
+    assert current != lost
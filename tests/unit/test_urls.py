@@ -0,0 +1,12 @@
+from app.core.urls import canonicalize_url, url_hash
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("HTTPS://Example.COM:443") == "https://example.com/"
+    assert canonicalize_url("http://example.com:8080/Path?q=1#section") == "http://example.com:8080/Path?q=1"
+
+
+def test_url_hash_ignores_insignificant_differences():
+    assert url_hash("HTTP://Example.com") == url_hash("http://example.com/")
+    assert url_hash("https://example.com/a") != url_hash("https://example.com/A")
+    assert len(url_hash("https://example.com")) == 64
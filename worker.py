@@ -0,0 +1,19 @@
+"""
+Отдельный процесс для общих задач кластера: удаление устаревших ссылок
+и запись накопленных переходов в БД. Запуск: python worker.py
+Вместе с ним API стоит запускать с RUN_CLUSTER_JOBS_IN_API=false
+"""
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from app.core.tasks import add_cluster_jobs
+from app.core.logger import logger
+
+
+if __name__ == "__main__":
+    scheduler = BlockingScheduler()
+    add_cluster_jobs(scheduler)
+    logger.info("Cluster jobs worker started")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass